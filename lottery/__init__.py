@@ -0,0 +1 @@
+"""彩票工具各页面共用的计算模块。"""
@@ -0,0 +1,199 @@
+"""各测算页面共用的结果缓存。
+
+按全部计算参数缓存结果：内存中最多保留 MAX_ENTRIES 组参数（超出后淘汰最久未使用的），
+同时持久化到磁盘，所有浏览器会话和重启后的应用都能直接复用，重复或常用的参数无需重新计算。
+以下划线开头的参数（如并行进程数）不影响结果，不参与缓存键。
+
+总进球的连败结构分布只按 (天数, 未中奖天数, 投注策略, 倍数) 缓存，与赔率、起投金额无关；
+各盈亏表在其上（注额转为浮点数后单独缓存一份）按赔率/起投金额推导，调整赔率时不会重新做动态规划。连败结构超过
+total_goals.MAX_STRUCTURES 种时结构和各盈亏表均返回 None（同样缓存，不会每次重跑到上限才放弃），
+全部未中奖天数的结构和盈亏曲面也一样。
+图表按（分箱后的）图表数据缓存渲染好的 PNG，结果表不变时不重新绘图。
+逐条路径表及其汇总、全部未中奖天数的连败结构和盈亏曲面，以及给定种子的随机模拟结果（可复现，同样按参数缓存），
+单组结果可达百万行，只保存在内存中且条数更少（LARGE_MAX_ENTRIES、SIMULATION_MAX_ENTRIES）。
+上传的历史数据按文件内容的哈希缓存解析结果、重抽样数组和推荐索引，文件内容本身不参与缓存键。
+"""
+import streamlit as st
+
+from lottery import charts, drilldown, history, paths, recommend, risk, simulation, total_goals
+
+# 内存中最多缓存的参数组合数
+MAX_ENTRIES = 128
+# 单组可达百万行的表（路径表、盈亏曲面）最多缓存的参数组合数，只保存在内存中
+LARGE_MAX_ENTRIES = 4
+# 随机模拟结果最多缓存的参数组合数
+SIMULATION_MAX_ENTRIES = 8
+
+
+@st.cache_data(max_entries=MAX_ENTRIES, persist="disk", show_spinner="正在统计连败结构...")
+def streak_distribution(days, no_win_days, strategy=total_goals.FIBONACCI, multiplier=2, with_tail=False):
+    try:
+        return total_goals.streak_distribution(days, no_win_days, strategy, multiplier, with_tail)
+    except total_goals.StructureLimitError:
+        return None
+
+
+@st.cache_data(max_entries=LARGE_MAX_ENTRIES, show_spinner="正在统计连败结构...")
+def streak_surface(days, strategy=total_goals.FIBONACCI, multiplier=2):
+    try:
+        return total_goals.streak_surface(days, strategy, multiplier)
+    except total_goals.StructureLimitError:
+        return None
+
+
+@st.cache_data(max_entries=MAX_ENTRIES, persist="disk", show_spinner="正在计算盈亏分布...")
+def profit_distribution(odds, days, no_win_days, initial_bet, strategy=total_goals.FIBONACCI, multiplier=2,
+                        percent_column='百分比'):
+    structure = streak_distribution(days, no_win_days, strategy, multiplier)
+    if structure is None:
+        return None
+    return total_goals.profit_distribution(odds, days, no_win_days, initial_bet, strategy, multiplier,
+                                           percent_column, structure)
+
+
+@st.cache_data(max_entries=MAX_ENTRIES, persist="disk", show_spinner="正在统计连败结构...")
+def float_structure(days, no_win_days, strategy=total_goals.FIBONACCI, multiplier=2):
+    # 注额转为浮点数后缓存：调整赔率时各盈亏表直接复用，读缓存也不必反序列化 Python 大整数
+    structure = streak_distribution(days, no_win_days, strategy, multiplier, with_tail=True)
+    if structure is None:
+        return None
+    return total_goals.float_structure(structure)
+
+
+@st.cache_data(max_entries=MAX_ENTRIES, persist="disk", show_spinner="正在计算盈亏分布...")
+def player_tables(odds, days, no_win_days, initial_bet, strategy=total_goals.FIBONACCI, multiplier=2,
+                  percent_column='概率'):
+    structure = float_structure(days, no_win_days, strategy, multiplier)
+    if structure is None:
+        return None
+    return total_goals.player_tables(odds, days, no_win_days, initial_bet, strategy, multiplier, percent_column,
+                                     structure)
+
+
+@st.cache_data(max_entries=MAX_ENTRIES, persist="disk", show_spinner="正在计算店主收入分布...")
+def joint_tables(odds, days, no_win_days, initial_bet, commission_rate, actual_odds,
+                 strategy=total_goals.FIBONACCI, multiplier=2, percent_column='概率'):
+    structure = float_structure(days, no_win_days, strategy, multiplier)
+    if structure is None:
+        return None
+    return total_goals.joint_tables(odds, days, no_win_days, initial_bet, commission_rate, actual_odds, strategy,
+                                    multiplier, percent_column, structure)
+
+
+@st.cache_data(max_entries=LARGE_MAX_ENTRIES, show_spinner="正在计算全部未中奖天数的盈亏分布...")
+def profit_surface(odds, days, initial_bet, strategy=total_goals.FIBONACCI, multiplier=2):
+    # 不含每日中奖概率：加权只是按未中奖天数乘一个系数，由调用方用 total_goals.weight_surface 在缓存结果上计算
+    surface = streak_surface(days, strategy, multiplier)
+    if surface is None:
+        return None
+    return total_goals.profit_surface(odds, days, initial_bet, strategy, multiplier, surface)
+
+
+@st.cache_data(max_entries=LARGE_MAX_ENTRIES, show_spinner="正在回放逐条路径...")
+def path_table(odds, days, no_win_days, initial_bet, strategy, multiplier, commission_rate, actual_odds,
+               _workers=1):
+    return paths.path_table(odds, days, no_win_days, initial_bet, strategy, multiplier, commission_rate,
+                            actual_odds, workers=_workers)
+
+
+@st.cache_data(max_entries=LARGE_MAX_ENTRIES, show_spinner="正在回放逐条路径...")
+def summarize_paths(odds, days, no_win_days, initial_bet, strategy, multiplier, commission_rate, actual_odds,
+                    top_n=10, columns=('总盈亏',), _workers=1):
+    return paths.summarize_paths(odds, days, no_win_days, initial_bet, strategy, multiplier, commission_rate,
+                                 actual_odds, top_n, columns, workers=_workers)
+
+
+@st.cache_data(max_entries=MAX_ENTRIES, persist="disk", show_spinner="正在定位路径...")
+def extreme_paths(odds, days, no_win_days, count, initial_bet, strategy=total_goals.FIBONACCI, multiplier=2,
+                  largest=False):
+    # 与 player_tables/joint_tables 共用带末尾连败天数的结构，去掉该列即可，不再单独做一次动态规划
+    structures = streak_distribution(days, no_win_days, strategy, multiplier, with_tail=True)
+    if structures is None:
+        return None
+    structures = total_goals.fold_tail(structures)
+    return drilldown.extreme_paths(odds, days, no_win_days, count, initial_bet, strategy, multiplier, largest,
+                                   structures)
+
+
+@st.cache_data(max_entries=MAX_ENTRIES, persist="disk", show_spinner="正在定位路径...")
+def outcome_paths(odds, days, no_win_days, profit, initial_bet, strategy=total_goals.FIBONACCI, multiplier=2,
+                  limit=10):
+    structures = streak_distribution(days, no_win_days, strategy, multiplier, with_tail=True)
+    if structures is None:
+        return None
+    structures = total_goals.fold_tail(structures)
+    return drilldown.outcome_paths(odds, days, no_win_days, profit, initial_bet, strategy, multiplier, limit,
+                                   structures)
+
+
+@st.cache_data(max_entries=MAX_ENTRIES, persist="disk", show_spinner=False)
+def bar_png(labels, heights, title, xlabel, ylabel, figsize=None, rotation=None):
+    return charts.bar_png(labels, heights, title, xlabel, ylabel, figsize, rotation)
+
+
+@st.cache_data(max_entries=MAX_ENTRIES, persist="disk", show_spinner=False)
+def pie_png(labels, shares, title):
+    return charts.pie_png(labels, shares, title)
+
+
+@st.cache_data(max_entries=SIMULATION_MAX_ENTRIES, show_spinner="正在模拟...")
+def simulate_parallel(runs, capital, odds, win_prob, days, bets_per_day, strategy, total_target, daily_target=None,
+                      flat_stake=None, bet_percent=None, seed=0, _workers=1):
+    return simulation.simulate_parallel(runs, capital, odds, win_prob, days, bets_per_day, strategy, total_target,
+                                        daily_target, flat_stake, bet_percent, seed, workers=_workers)
+
+
+@st.cache_data(max_entries=MAX_ENTRIES, persist="disk", show_spinner="正在精确计算概率...")
+def exact_outcome(capital, odds, win_prob, days, bets_per_day, strategy, total_target, daily_target=None,
+                  flat_stake=None, bet_percent=None):
+    return simulation.exact_outcome(capital, odds, win_prob, days, bets_per_day, strategy, total_target,
+                                    daily_target, flat_stake, bet_percent)
+
+
+@st.cache_data(max_entries=MAX_ENTRIES, persist="disk", show_spinner="正在扫描参数组合...")
+def simulate_grid(runs, capital, odds, win_prob, days, bets_per_day, strategy, total_target, daily_target=None,
+                  flat_stake=None, bet_percent=None, seed=0):
+    return simulation.simulate_grid(runs, capital, odds, win_prob, days, bets_per_day, strategy, total_target,
+                                    daily_target, flat_stake, bet_percent, seed)
+
+
+@st.cache_data(max_entries=SIMULATION_MAX_ENTRIES, show_spinner="正在对比各策略...")
+def compare_strategies(runs, capital, odds, win_prob, days, bets_per_day, strategies, total_target, daily_target=None,
+                       flat_stake=None, bet_percent=None, seed=0, antithetic=False):
+    return simulation.compare_strategies(runs, capital, odds, win_prob, days, bets_per_day, strategies, total_target,
+                                         daily_target, flat_stake, bet_percent, seed, antithetic)
+
+
+@st.cache_data(max_entries=MAX_ENTRIES, persist="disk", show_spinner="正在用重要性抽样估计破产概率...")
+def importance_ruin(runs, capital, odds, win_prob, days, bets_per_day, strategy, total_target, daily_target=None,
+                    flat_stake=None, bet_percent=None, seed=0):
+    return simulation.importance_ruin(runs, capital, odds, win_prob, days, bets_per_day, strategy, total_target,
+                                      daily_target, flat_stake, bet_percent, seed=seed)
+
+
+@st.cache_data(max_entries=SIMULATION_MAX_ENTRIES, persist="disk", show_spinner="正在解析历史数据...")
+def load_history(digest, file_name, _data):
+    return history.read_history(_data, file_name)
+
+
+@st.cache_data(max_entries=SIMULATION_MAX_ENTRIES, persist="disk", show_spinner=False)
+def bootstrap_sample(digest, odds_col, outcome_col, profit_col, _data):
+    return risk.bootstrap_sample(_data, odds_col, outcome_col, profit_col)
+
+
+@st.cache_data(max_entries=SIMULATION_MAX_ENTRIES, show_spinner="正在按历史记录重抽样模拟...")
+def simulate_bootstrap(digest, runs, capital, days, bets_per_day, strategy, total_target, daily_target=None,
+                       flat_stake=None, bet_percent=None, block_length=simulation.BOOTSTRAP_BLOCK_LENGTH, seed=0,
+                       _sample=None):
+    history_odds, history_wins, history_win_prob = _sample
+    return simulation.simulate_bootstrap(runs, capital, history_odds, history_wins, days, bets_per_day, strategy,
+                                         total_target, daily_target, flat_stake, bet_percent, history_win_prob,
+                                         block_length, seed)
+
+
+@st.cache_data(max_entries=SIMULATION_MAX_ENTRIES, persist="disk", show_spinner="正在汇总历史命中率...")
+def recommendation_index(digest, odds_col, outcome_col, profit_col, play_col, match_col, _data):
+    wins = risk.win_flags(_data, outcome_col, profit_col)
+    plays = None if play_col is None else _data[play_col]
+    index = recommend.hit_rate_index(_data[odds_col].to_numpy(dtype=float), wins, plays)
+    return index, recommend.candidates(_data, odds_col, play_col, match_col)
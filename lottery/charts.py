@@ -0,0 +1,132 @@
+"""盈亏分布图表：不同结果很多时自动分箱，按图表数据渲染成 PNG。
+
+柱状图最多 MAX_BARS 根柱子（超过时按数值等宽分箱，出现次数相加），饼图最多 MAX_SLICES 块
+（占比最小的合并为"其他"），绘图耗时与不同结果的数量无关。
+长序列的折线/面积图（累计盈亏、回撤）按最大三角形三桶法（LTTB）降采样到固定点数，
+并保留全局最高/最低点，交给图表的数据量与序列长度无关。
+"""
+import io
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+# 柱状图最多的柱子数
+MAX_BARS = 50
+# 饼图最多的扇区数（含"其他"）
+MAX_SLICES = 12
+# 折线图降采样后的默认点数
+MAX_POINTS = 2000
+
+# 分箱时两端各有这么多的概率并入首尾两根柱子，避免极端值把主体压成一根柱子
+TAIL_SHARE = 0.005
+
+
+def _format(value, width):
+    return f'{value:.0f}' if width >= 1 else f'{value:.2f}'
+
+
+def _weighted_quantile(values, weights, share):
+    order = np.argsort(values, kind='stable')
+    cumulative = np.cumsum(weights[order])
+    return values[order][np.searchsorted(cumulative, share * cumulative[-1])]
+
+
+def bar_data(table, value_column, count_column='出现次数', max_bars=MAX_BARS):
+    """柱状图数据 (标签, 高度)。
+
+    不同结果不超过 max_bars 个时按原表顺序逐个画；否则在去掉两端各 TAIL_SHARE 概率后的区间内
+    按数值等宽分箱，两端的极端值分别并入首尾两根柱子。
+    """
+    values = table[value_column].to_numpy(dtype=float)
+    counts = table[count_column].to_numpy(dtype=float)
+    if len(values) <= max_bars:
+        return tuple(table[value_column].astype(str)), tuple(counts)
+    low = _weighted_quantile(values, counts, TAIL_SHARE)
+    high = _weighted_quantile(values, counts, 1 - TAIL_SHARE)
+    if low == high:
+        low, high = values.min(), values.max()
+    heights, edges = np.histogram(np.clip(values, low, high), bins=max_bars, range=(low, high), weights=counts)
+    width = edges[1] - edges[0]
+    labels = [f'{_format(left, width)}~{_format(right, width)}' for left, right in zip(edges[:-1], edges[1:])]
+    if values.min() < low:
+        labels[0] = f'≤{_format(edges[1], width)}'
+    if values.max() > high:
+        labels[-1] = f'≥{_format(edges[-2], width)}'
+    return tuple(labels), tuple(heights)
+
+
+def pie_data(table, value_column, percent_column='百分比', max_slices=MAX_SLICES):
+    """饼图数据 (标签, 占比)。超过 max_slices 块时保留占比最大的几块，其余合并为"其他"。"""
+    table = table.sort_values(percent_column, ascending=False, kind='stable')
+    labels = list(table[value_column].astype(str))
+    shares = list(table[percent_column].astype(float))
+    if len(labels) > max_slices:
+        other = sum(shares[max_slices - 1:])
+        labels = labels[:max_slices - 1] + ['其他']
+        shares = shares[:max_slices - 1] + [other]
+    return tuple(labels), tuple(shares)
+
+
+def lttb_indices(values, max_points=MAX_POINTS):
+    """最大三角形三桶法：从 values（横坐标为序号）中选出至多 max_points 个点的序号，保留曲线形状。
+
+    首尾点必选；其余点均分到 max_points - 2 个桶中，每个桶选与上一个已选点、下一个桶均值
+    构成三角形面积最大的点。
+    """
+    values = np.asarray(values, dtype=float)
+    count = len(values)
+    if count <= max_points or max_points < 3:
+        return np.arange(count)
+    edges = np.linspace(1, count - 1, max_points - 1).astype(np.int64)
+    # 下一个桶的均值（最后一个桶的下一个"桶"为末点）
+    sums = np.concatenate(([0.0], np.cumsum(values)))
+    starts, stops = edges[:-1], edges[1:]
+    next_x = np.append((starts[1:] + stops[1:] - 1) / 2, count - 1)
+    next_y = np.append((sums[stops[1:]] - sums[starts[1:]]) / (stops[1:] - starts[1:]), values[-1])
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, count - 1
+    previous = 0
+    for bucket, (start, stop) in enumerate(zip(starts, stops)):
+        x = np.arange(start, stop)
+        area = np.abs((previous - next_x[bucket]) * (values[start:stop] - values[previous])
+                      - (previous - x) * (next_y[bucket] - values[previous]))
+        previous = start + int(area.argmax())
+        selected[bucket + 1] = previous
+    return selected
+
+
+def downsample(values, max_points=MAX_POINTS, keep=()):
+    """LTTB 降采样后的序号，并补上 keep 中的序号以及全局最大/最小值所在的点（极值保持精确）。"""
+    values = np.asarray(values, dtype=float)
+    if len(values) <= max_points:
+        return np.arange(len(values))
+    extra = [int(values.argmax()), int(values.argmin())] + [int(index) for index in keep]
+    return np.union1d(lttb_indices(values, max_points), extra)
+
+
+def _png(fig):
+    image = io.BytesIO()
+    fig.savefig(image, format='png', dpi=100)
+    plt.close(fig)
+    return image.getvalue()
+
+
+def bar_png(labels, heights, title, xlabel, ylabel, figsize=None, rotation=None):
+    """画柱状图并返回 PNG 字节。"""
+    fig, ax = plt.subplots(figsize=figsize)
+    ax.bar(labels, heights, color='skyblue')
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    if rotation is not None or len(labels) > 10:
+        plt.setp(ax.get_xticklabels(), rotation=rotation if rotation is not None else 90, fontsize='small')
+    fig.tight_layout()
+    return _png(fig)
+
+
+def pie_png(labels, shares, title):
+    """画饼图并返回 PNG 字节。"""
+    fig, ax = plt.subplots()
+    ax.pie(shares, labels=labels, autopct='%1.1f%%', startangle=90)
+    ax.set_title(title)
+    return _png(fig)
@@ -0,0 +1,198 @@
+"""总进球玩法的路径定位：不展开、不排序全部路径，直接取出具体的未中奖天数组合。
+
+- 按组合序号：字典序排名与组合之间直接互相换算（组合排名/反排名），每条路径 O(天数)。
+- 按总盈亏：先在连败结构分布中找出对应的 (中奖注额, 未中奖注额)，再回溯出连败长度组成，
+  把这些连败段排列到各中奖天之前，即得到具体路径。
+"""
+from math import comb
+
+import numpy as np
+import pandas as pd
+
+from lottery.total_goals import FIBONACCI, bet_ladder, loss_totals, player_profit, streak_distribution
+
+
+def rank_combination(days, combo):
+    """未中奖天数组合在全部 C(days, len(combo)) 个组合中的字典序序号（从 0 开始）。"""
+    no_win_days = len(combo)
+    rank = 0
+    lower = 0
+    for position, value in enumerate(combo):
+        # 该位取比 value 小的值时，后续位置的组合都排在前面
+        rank += comb(days - lower, no_win_days - position) - comb(days - value, no_win_days - position)
+        lower = value + 1
+    return rank
+
+
+def unrank_combination(days, no_win_days, rank):
+    """按字典序序号取出对应的未中奖天数组合。"""
+    combo = []
+    value = 0
+    for position in range(no_win_days):
+        remaining = no_win_days - position - 1
+        # 跳过以更小的值开头的所有组合
+        while comb(days - value - 1, remaining) <= rank:
+            rank -= comb(days - value - 1, remaining)
+            value += 1
+        combo.append(value)
+        value += 1
+    return tuple(combo)
+
+
+def daily_profits(combo, days, odds, initial_bet, strategy=FIBONACCI, multiplier=2):
+    """回放一条路径，返回每日盈亏列表（与原页面逐日计算的口径一致）。"""
+    ladder = bet_ladder(strategy, multiplier, len(combo))
+    losses = set(combo)
+    streak = 0
+    profits = []
+    for day in range(days):
+        bet = initial_bet * ladder[streak]
+        if day in losses:
+            profits.append(-bet)
+            streak += 1
+        else:
+            profits.append(bet * odds - bet)
+            streak = 0
+    return profits
+
+
+def _streak_counts(win_units, loss_units, days, no_win_days, ladder, loss_total, limit):
+    """回溯找出使中奖/未中奖注额合计恰为给定值的连败长度组成，最多 limit 个。
+
+    产出 ({连败长度: 段数}, 末尾连败天数)。
+    """
+    win_days = days - no_win_days
+    found = []
+
+    def search(streak, losses, slots, extra_win, loss, chosen):
+        if len(found) >= limit:
+            return
+        if losses == 0:
+            if extra_win == 0 and loss == 0:
+                found.append(dict(chosen))
+            return
+        if streak == 0 or slots * streak < losses:
+            return
+        # 每个未中奖天在长度 s 的连败中平均贡献的注额随 s 不减，据此剪枝
+        if extra_win * streak > losses * (ladder[streak] - 1) or extra_win < losses * (ladder[1] - 1):
+            return
+        if loss * streak > losses * loss_total[streak] or loss < losses * loss_total[1]:
+            return
+        for times in range(min(losses // streak, slots), -1, -1):
+            if times:
+                chosen.append((streak, times))
+            search(streak - 1, losses - times * streak, slots - times,
+                   extra_win - times * (ladder[streak] - 1), loss - times * loss_total[streak], chosen)
+            if times:
+                chosen.pop()
+
+    results = []
+    for tail in range(no_win_days + 1):
+        if win_days == 0 and tail != no_win_days:
+            continue
+        found.clear()
+        # 每个中奖天至少按起投金额中奖，超出部分来自中奖前的连败
+        search(no_win_days - tail, no_win_days - tail, win_days, win_units - win_days,
+               loss_units - loss_total[tail], [])
+        results.extend((counts, tail) for counts in found)
+        if len(results) >= limit:
+            break
+    return results[:limit]
+
+
+def _arrangements(counts, win_days, limit):
+    """把连败段排列到各中奖天之前，按字典序产出不同的排列（每个中奖天前的连败长度）。"""
+    slots = sorted([streak for streak, times in counts.items() for _ in range(times)]
+                   + [0] * (win_days - sum(counts.values())), reverse=True)
+    for _ in range(limit):
+        yield list(slots)
+        # 求下一个更小的排列（多重集合的逆字典序）
+        pivot = len(slots) - 2
+        while pivot >= 0 and slots[pivot] <= slots[pivot + 1]:
+            pivot -= 1
+        if pivot < 0:
+            return
+        swap = len(slots) - 1
+        while slots[swap] >= slots[pivot]:
+            swap -= 1
+        slots[pivot], slots[swap] = slots[swap], slots[pivot]
+        slots[pivot + 1:] = reversed(slots[pivot + 1:])
+
+
+def _combo_from_slots(slots, tail):
+    """由每个中奖天前的连败长度和末尾连败还原未中奖天数组合。"""
+    combo = []
+    day = 0
+    for streak in slots:
+        combo.extend(range(day, day + streak))
+        day += streak + 1
+    combo.extend(range(day, day + tail))
+    return tuple(combo)
+
+
+def _path_frame(combos, days, odds, initial_bet, strategy, multiplier):
+    rows = []
+    for combo in combos:
+        profits = daily_profits(combo, days, odds, initial_bet, strategy, multiplier)
+        rows.append({
+            "组合序号": rank_combination(days, combo),
+            "未中奖天数": combo,
+            "每日盈亏": profits,
+            "总盈亏": sum(profits),
+        })
+    return pd.DataFrame(rows, columns=["组合序号", "未中奖天数", "每日盈亏", "总盈亏"])
+
+
+def path_at_rank(odds, days, no_win_days, rank, initial_bet=100, strategy=FIBONACCI, multiplier=2):
+    """按字典序序号取出一条路径及其每日盈亏。"""
+    combo = unrank_combination(days, no_win_days, rank)
+    return _path_frame([combo], days, odds, initial_bet, strategy, multiplier)
+
+
+def _outcome_combos(structures, profits, target, days, no_win_days, ladder, loss_total, limit):
+    combos = []
+    for index in np.flatnonzero(np.round(profits, 2) == round(target, 2)):
+        win_units = int(structures['中奖注额'].iloc[index])
+        loss_units = int(structures['未中奖注额'].iloc[index])
+        for counts, tail in _streak_counts(win_units, loss_units, days, no_win_days, ladder, loss_total,
+                                           limit - len(combos)):
+            for slots in _arrangements(counts, days - no_win_days, limit - len(combos)):
+                combos.append(_combo_from_slots(slots, tail))
+            if len(combos) >= limit:
+                return combos
+    return combos
+
+
+def _ladder_tables(strategy, multiplier, no_win_days):
+    ladder = bet_ladder(strategy, multiplier, max(no_win_days, 1))
+    return ladder, loss_totals(ladder)
+
+
+def outcome_paths(odds, days, no_win_days, profit, initial_bet=100, strategy=FIBONACCI, multiplier=2, limit=10,
+                  structures=None):
+    """取出总盈亏等于 profit 的至多 limit 条路径及其每日盈亏（structures 为已算好的连败结构分布）。"""
+    if structures is None:
+        structures = streak_distribution(days, no_win_days, strategy, multiplier)
+    profits = player_profit(structures, odds, initial_bet)
+    ladder, loss_total = _ladder_tables(strategy, multiplier, no_win_days)
+    combos = _outcome_combos(structures, profits, profit, days, no_win_days, ladder, loss_total, limit)
+    return _path_frame(combos, days, odds, initial_bet, strategy, multiplier)
+
+
+def extreme_paths(odds, days, no_win_days, count=10, initial_bet=100, strategy=FIBONACCI, multiplier=2,
+                  largest=False, structures=None):
+    """取出总盈亏最差（largest=True 时为最好）的 count 条路径，只按不同结果排序而不展开全部路径。"""
+    if structures is None:
+        structures = streak_distribution(days, no_win_days, strategy, multiplier)
+    profits = player_profit(structures, odds, initial_bet)
+    ladder, loss_total = _ladder_tables(strategy, multiplier, no_win_days)
+    outcomes = np.unique(np.round(profits, 2))
+    if largest:
+        outcomes = outcomes[::-1]
+    combos = []
+    for target in outcomes:
+        combos.extend(_outcome_combos(structures, profits, target, days, no_win_days, ladder, loss_total,
+                                      count - len(combos)))
+        if len(combos) >= count:
+            break
+    return _path_frame(combos, days, odds, initial_bet, strategy, multiplier)
@@ -0,0 +1,145 @@
+"""计划单历史投注数据的读取。
+
+大文件按块解析：CSV 用 read_csv 分块读取，xlsx 用 openpyxl 只读模式逐行流式读取，每块读入后立即
+转换为紧凑的列类型（赔率 float32、中奖结果 int8、文本列 category，整数列按取值范围缩小），
+峰值内存只比结果多一块。结果按文件内容的哈希缓存（见 cache.load_history），重复上传同一文件直接复用。
+"""
+import hashlib
+import io
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# 每块读取的行数
+CHUNK_ROWS = 200000
+
+# 常见字段的中文/英文列名（不区分大小写）
+ODDS_NAMES = ["odds", "赔率"]
+PROFIT_NAMES = ["profit", "盈亏", "收益"]
+OUTCOME_NAMES = ["result", "outcome", "中奖", "是否中奖"]
+STAKE_NAMES = ["stake", "投注", "投注额", "金额"]
+GROUP_NAMES = ["group", "组别", "分组"]
+PLAY_NAMES = ["play", "玩法"]
+MATCH_NAMES = ["match", "比赛", "场次"]
+# 中奖结果列中表示中奖的取值
+WIN_VALUES = [1, '1', 'win', 'Win', 'WIN', '中奖']
+
+
+def content_hash(data):
+    """文件内容的 SHA-256，作为缓存键。"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def detect_columns(columns):
+    """按列名识别赔率、盈亏、中奖结果、投注额、组别、玩法、比赛、日期列，返回 {用途: 列名}，未找到的为 None。"""
+    roles = {"odds": None, "profit": None, "outcome": None, "stake": None, "group": None, "play": None,
+             "match": None, "date": None}
+    for col in columns:
+        name = str(col).lower()
+        if name in ODDS_NAMES:
+            roles["odds"] = col
+        if name in PROFIT_NAMES:
+            roles["profit"] = col
+        if name in OUTCOME_NAMES:
+            roles["outcome"] = col
+        if name in STAKE_NAMES:
+            roles["stake"] = col
+        if name in GROUP_NAMES:
+            roles["group"] = col
+        if name in PLAY_NAMES:
+            roles["play"] = col
+        if name in MATCH_NAMES:
+            roles["match"] = col
+        if roles["date"] is None and ("date" in name or "日期" in str(col)):
+            roles["date"] = col
+    return roles
+
+
+def compact_chunk(chunk, roles):
+    """把一块数据转换为紧凑的列类型：中奖结果转为 0/1 的 int8，赔率 float32，金额保持 float64，
+    其余整数列按取值范围缩小，文本列转为 category（日期列在合并后再解析）。"""
+    for col in chunk.columns:
+        values = chunk[col]
+        if col == roles["outcome"]:
+            chunk[col] = values.isin(WIN_VALUES).astype(np.int8)
+        elif col == roles["odds"]:
+            chunk[col] = pd.to_numeric(values, errors="coerce").astype(np.float32)
+        elif col in (roles["profit"], roles["stake"]):
+            chunk[col] = pd.to_numeric(values, errors="coerce").astype(np.float64)
+        elif col == roles["date"]:
+            continue
+        elif pd.api.types.is_integer_dtype(values):
+            chunk[col] = pd.to_numeric(values, downcast="integer")
+        elif values.dtype == object or pd.api.types.is_string_dtype(values):
+            chunk[col] = values.astype("category")
+    return chunk
+
+
+def _concat_chunks(chunks):
+    """按列合并各块，各块 category 列的类别取并集（直接 concat 会退化为 object）。"""
+    if len(chunks) == 1:
+        return chunks[0].reset_index(drop=True)
+    columns = {}
+    for col in chunks[0].columns:
+        parts = [chunk[col] for chunk in chunks]
+        if all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            columns[col] = pd.Series(union_categoricals(parts, ignore_order=True))
+        else:
+            columns[col] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def _csv_chunks(data, chunk_rows):
+    yield from pd.read_csv(io.BytesIO(data), chunksize=chunk_rows)
+
+
+def _xlsx_chunks(data, chunk_rows):
+    """openpyxl 只读模式逐行读取活动工作表，第一行为表头，每 chunk_rows 行组成一块。"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        while True:
+            block = list(islice(rows, chunk_rows))
+            if not block:
+                break
+            yield pd.DataFrame(block, columns=header)
+    finally:
+        workbook.close()
+
+
+def read_history(data, file_name, chunk_rows=CHUNK_ROWS):
+    """解析上传的历史数据文件（CSV/xlsx/xls 的字节内容），返回列类型紧凑的 DataFrame。"""
+    name = file_name.lower()
+    if name.endswith(".csv"):
+        chunks = _csv_chunks(data, chunk_rows)
+    elif name.endswith(".xlsx"):
+        chunks = _xlsx_chunks(data, chunk_rows)
+    else:
+        # 旧版 xls 不支持流式读取，整体读入后同样转换列类型
+        chunks = iter([pd.read_excel(io.BytesIO(data))])
+
+    roles = None
+    compacted = []
+    for chunk in chunks:
+        if roles is None:
+            roles = detect_columns(chunk.columns)
+        compacted.append(compact_chunk(chunk, roles))
+    if not compacted:
+        return pd.DataFrame()
+    history = _concat_chunks(compacted)
+
+    date_col = roles["date"]
+    if date_col is not None:
+        try:
+            history[date_col] = pd.to_datetime(history[date_col])
+        except (ValueError, TypeError):
+            # 无法解析为日期时保留原值，按原值排序
+            pass
+    return history
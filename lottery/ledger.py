@@ -0,0 +1,114 @@
+"""投注记录台账：按 (组别, 日期) 索引，同一组同一日期只保留一条记录。
+
+记录存放在以 (组别, 日期) 为键的字典中，新增、覆盖、删除都是 O(1)，覆盖时保留原来的位置；
+每组另按日期建字典，组内日期排序只在需要按日期区间查询时才做（之后未新增日期则直接复用），
+区间查询用二分查找。统计用的 DataFrame 按组缓存，台账未变化时不重新构造。
+没有组别字段的记录（主页面）组别为 None。
+"""
+import datetime
+from bisect import bisect_left, bisect_right
+
+import pandas as pd
+
+
+def date_key(value):
+    """日期统一为 YYYY-MM-DD 字符串（Excel 读入的日期可能是 Timestamp）。"""
+    if isinstance(value, (datetime.date, pd.Timestamp)):
+        return value.strftime("%Y-%m-%d")
+    return str(value)
+
+
+def _group_key(value):
+    # Excel 中空的组别读入为 NaN
+    return None if value is None or (isinstance(value, float) and value != value) else value
+
+
+# records/frame 的默认参数：不按组别筛选
+_ALL = object()
+
+
+class Ledger:
+    """投注记录台账。"""
+
+    def __init__(self, records=()):
+        self._records = {}
+        self._groups = {}
+        self._sorted_dates = {}
+        self._frames = {}
+        self.extend(records)
+
+    def __len__(self):
+        return len(self._records)
+
+    def _changed(self, group):
+        self._frames.pop(group, None)
+        self._frames.pop(_ALL, None)
+
+    def upsert(self, record):
+        """按记录的 组别、日期 新增或覆盖一条记录，返回是否为覆盖。"""
+        group = _group_key(record.get("组别"))
+        date = date_key(record.get("日期"))
+        key = (group, date)
+        updated = key in self._records
+        self._records[key] = record
+        dates = self._groups.setdefault(group, {})
+        if date not in dates:
+            # 新日期使该组已排序的日期失效
+            self._sorted_dates.pop(group, None)
+        dates[date] = record
+        self._changed(group)
+        return updated
+
+    def extend(self, records):
+        """依次 upsert 多条记录，返回被覆盖的条数（同一组同一日期只保留最后一条）。"""
+        return sum(self.upsert(record) for record in records)
+
+    def delete(self, group, date):
+        """删除一条记录，返回是否存在。"""
+        group, date = _group_key(group), date_key(date)
+        if self._records.pop((group, date), None) is None:
+            return False
+        del self._groups[group][date]
+        self._sorted_dates.pop(group, None)
+        self._changed(group)
+        return True
+
+    def replace_group(self, group, records):
+        """用 records 替换 group 组的全部记录（其他组不变），返回 records 中被覆盖的条数。"""
+        for date in list(self._groups.get(_group_key(group), {})):
+            self.delete(group, date)
+        return self.extend(records)
+
+    def get(self, group, date):
+        """取出一条记录，不存在时返回 None。"""
+        return self._records.get((_group_key(group), date_key(date)))
+
+    def groups(self):
+        """有记录的组别。"""
+        return [group for group, dates in self._groups.items() if dates]
+
+    def records(self, group=_ALL):
+        """记录列表（按录入顺序），指定 group 时只返回该组。"""
+        if group is _ALL:
+            return list(self._records.values())
+        return list(self._groups.get(_group_key(group), {}).values())
+
+    def range(self, group, start=None, end=None):
+        """group 组日期在 [start, end] 内的记录，按日期排序。"""
+        group = _group_key(group)
+        dates = self._sorted_dates.get(group)
+        if dates is None:
+            dates = sorted(self._groups.get(group, {}))
+            self._sorted_dates[group] = dates
+        low = 0 if start is None else bisect_left(dates, date_key(start))
+        high = len(dates) if end is None else bisect_right(dates, date_key(end))
+        return [self._groups[group][date] for date in dates[low:high]]
+
+    def frame(self, group=_ALL):
+        """记录的 DataFrame（列式视图，用于统计），指定 group 时只含该组；台账未变化时复用上次构造的结果。"""
+        if group is not _ALL:
+            group = _group_key(group)
+        if group not in self._frames:
+            self._frames[group] = pd.DataFrame(self.records(group))
+        # 浅拷贝：调用方增加列不影响缓存
+        return self._frames[group].copy(deep=False)
@@ -0,0 +1,83 @@
+"""投注记录台账的盈亏统计（主页面和分组页面共用）。
+
+彩民盈亏、店主盈亏按整列运算一次算出；统计指标总览表的各项数据由按 玩法、是否中奖 的一次 groupby
+汇总得到。两个页面的公式不同，用 grouped 区分：
+  主页面：中奖时 店主盈亏 = 下单金额 ×（体彩实际赔付赔率 - 给彩民赔率）×（1 - 体彩提成）；
+  分组页面：中奖时 店主盈亏 = 下单金额 ×（体彩实际赔付赔率 - 给彩民赔率）+ 下单金额 × 体彩提成，
+           彩民盈亏、店主盈亏、下单金额均乘以彩民数量。
+未中奖时 彩民盈亏 = -下单金额，店主盈亏 = 下单金额 × 体彩提成。
+"""
+import numpy as np
+import pandas as pd
+
+# 统计表中展示的玩法
+PLAYS = ["二串一", "总进球"]
+# 缺少对应列时的默认值
+DEFAULTS = {"给彩民赔率": 2.0, "体彩实际赔付赔率": 1.0, "体彩提成": 0, "彩民数量": 30}
+
+
+def _column(df, name):
+    if name in df.columns:
+        return df[name].to_numpy(dtype=float)
+    return np.full(len(df), float(DEFAULTS[name]))
+
+
+def add_profits(df, grouped=False):
+    """按整列运算增加 彩民盈亏、店主盈亏 两列（grouped 为 True 时按分组页面的公式），返回 df。"""
+    win = (df["是否中奖"] == "是").to_numpy()
+    bet = df["下单金额"].to_numpy(dtype=float)
+    given_odds = _column(df, "给彩民赔率")
+    official_odds = _column(df, "体彩实际赔付赔率")
+    commission = _column(df, "体彩提成")
+    user_profit = np.where(win, bet * given_odds - bet, -bet)
+    if grouped:
+        num = _column(df, "彩民数量")
+        user_profit = user_profit * num
+        host_profit = np.where(win, bet * (official_odds - given_odds) + bet * commission, bet * commission) * num
+    else:
+        host_profit = np.where(win, bet * (official_odds - given_odds) * (1 - commission), bet * commission)
+    df["彩民盈亏"] = user_profit
+    df["店主盈亏"] = host_profit
+    return df
+
+
+def summary_table(df, grouped=False):
+    """由含盈亏列的记录生成 4 列的统计指标总览表（彩民端 2 列、店主端 2 列）。"""
+    stake = df["下单金额"].to_numpy(dtype=float)
+    num = _column(df, "彩民数量")
+    if grouped:
+        stake = stake * num
+    frame = pd.DataFrame({
+        "玩法": df["玩法"].to_numpy(),
+        "中奖": (df["是否中奖"] == "是").to_numpy(),
+        "投注次数": 1,
+        "下单金额": stake,
+        "彩民数量": num,
+        "彩民盈亏": df["彩民盈亏"].to_numpy(dtype=float),
+        "店主盈亏": df["店主盈亏"].to_numpy(dtype=float),
+    })
+    cube = frame.groupby(["玩法", "中奖"], dropna=False).sum()
+
+    totals = cube.sum()
+    by_play = cube.groupby(level="玩法", dropna=False).sum().reindex(PLAYS, fill_value=0)
+    wins = cube[cube.index.get_level_values("中奖")].groupby(level="玩法").sum()
+    wins = wins["投注次数"].reindex(PLAYS, fill_value=0)
+    counts = by_play["投注次数"]
+    win_rate = (wins / counts.where(counts > 0)).fillna(0)
+
+    if grouped:
+        # 单个彩民盈亏 = 总彩民盈亏 / 总彩民数量
+        bettors = totals["彩民数量"]
+        last_row = ["单个彩民盈亏情况", f"{totals['彩民盈亏'] / bettors if bettors > 0 else 0:.2f} 元"]
+    else:
+        last_row = ["", ""]
+    table_data = [
+        ["彩民累计下单金额", f"{totals['下单金额']:.2f} 元", "二串一中奖率", f"{win_rate['二串一'] * 100:.2f}%"],
+        ["彩民累计盈亏情况", f"{totals['彩民盈亏']:.2f} 元", "总进球中奖率", f"{win_rate['总进球'] * 100:.2f}%"],
+        ["彩民总进球盈亏情况", f"{by_play.loc['总进球', '彩民盈亏']:.2f} 元", "总进球盈亏情况",
+         f"{by_play.loc['总进球', '店主盈亏']:.2f} 元"],
+        ["彩民二串一盈亏情况", f"{by_play.loc['二串一', '彩民盈亏']:.2f} 元", "二串一盈亏情况",
+         f"{by_play.loc['二串一', '店主盈亏']:.2f} 元"],
+        last_row + ["总盈利情况", f"{totals['店主盈亏']:.2f} 元"],
+    ]
+    return pd.DataFrame(table_data, columns=["彩民端项目", "彩民端数据", "店主端项目", "店主端数据"])
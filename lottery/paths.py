@@ -0,0 +1,239 @@
+"""总进球玩法逐条路径回放。
+
+需要每条路径的明细（店主提成收入、赔率差收入等）时使用：把未中奖天数组合按块展开成
+布尔未中奖矩阵，逐天对整块路径做 NumPy 向量运算，内存占用只取决于块大小，与组合总数无关。
+"""
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from math import comb
+
+import numpy as np
+import pandas as pd
+
+from lottery.total_goals import FIBONACCI, INT64_LIMIT, bet_ladder, value_counts_table
+
+# 每块回放的路径数
+CHUNK_SIZE = 20000
+# 页面上展示逐条明细表时允许的最大路径数
+TABLE_MAX_PATHS = 200000
+# 流式汇总（只保留最差/最好路径）时允许的最大路径数
+STREAM_MAX_PATHS = 5000000
+# 路径数达到该值才分片到多进程（理由同 simulation.PARALLEL_MIN_RUNS）
+PARALLEL_MIN_PATHS = 200000
+
+
+def _completion_table(days, no_win_days):
+    """table[i, v] = C(days - v, no_win_days - i)：第 i 位取值不小于 v 时后续的组合数（截断到 int64 范围内）。"""
+    table = np.empty((no_win_days + 1, days + 1), dtype=np.int64)
+    for position in range(no_win_days + 1):
+        for value in range(days + 1):
+            table[position, value] = min(comb(days - value, no_win_days - position), INT64_LIMIT)
+    return table
+
+
+def unrank_block(days, no_win_days, start, stop, table=None):
+    """按字典序一次性展开第 start..stop-1 个组合（序号需在 int64 范围内），返回 (路径数, no_win_days) 数组。"""
+    if table is None:
+        table = _completion_table(days, no_win_days)
+    rank = np.arange(start, stop, dtype=np.int64)
+    lower = np.zeros(len(rank), dtype=np.int64)
+    combos = np.empty((len(rank), no_win_days), dtype=np.int64)
+    for position in range(no_win_days):
+        remaining = table[position, lower]
+        # 取最大的 v 使得从 v 开始的组合数仍不少于 remaining - rank
+        value = np.searchsorted(-table[position], rank - remaining, side='right') - 1
+        rank -= remaining - table[position, value]
+        combos[:, position] = value
+        lower = value + 1
+    return combos
+
+
+def combination_chunks(days, no_win_days, chunk_size=CHUNK_SIZE, start=0, stop=None):
+    """按字典序分块生成第 start..stop-1 个未中奖天数组合，每块为 (路径数, no_win_days) 的整数数组。"""
+    if stop is None:
+        stop = comb(days, no_win_days)
+    table = _completion_table(days, no_win_days)
+    for block_start in range(start, stop, chunk_size):
+        yield unrank_block(days, no_win_days, block_start, min(block_start + chunk_size, stop), table)
+
+
+def replay_chunk(combos, days, odds, initial_bet, strategy=FIBONACCI, multiplier=2, commission_rate=0.0,
+                 actual_odds=None, keep_daily=False):
+    """逐天向量化回放一块路径，返回各路径的盈亏、投注总金额和店主收入（字典形式的列）。"""
+    rows = len(combos)
+    losses = np.zeros((rows, days), dtype=bool)
+    losses[np.arange(rows)[:, None], combos] = True
+    ladder = initial_bet * np.array(bet_ladder(strategy, multiplier, combos.shape[1]), dtype=float)
+
+    streak = np.zeros(rows, dtype=np.int64)
+    total_profit = np.zeros(rows)
+    total_bet = np.zeros(rows)
+    odds_income = np.zeros(rows)
+    daily = np.empty((rows, days)) if keep_daily else None
+    for day in range(days):
+        bet = ladder[streak]
+        lost = losses[:, day]
+        profit = np.where(lost, -bet, bet * odds - bet)
+        streak = np.where(lost, streak + 1, 0)
+        # 与原页面口径一致：每天结算后累加的是下一注金额
+        total_bet += ladder[streak]
+        total_profit += profit
+        if actual_odds is not None:
+            odds_income += np.where(profit > 0, profit * (actual_odds - odds), 0.0)
+        if keep_daily:
+            daily[:, day] = profit
+
+    commission_income = total_bet * commission_rate
+    columns = {
+        '未中奖天数': combos,
+        '总盈亏': total_profit,
+        '投注总金额': total_bet,
+        '店主提成收入': commission_income,
+        '店主赔率差收入': odds_income,
+        '店主总收入': commission_income + odds_income,
+    }
+    if keep_daily:
+        columns['每日盈亏'] = daily
+    return columns
+
+
+def replay_paths(odds, days, no_win_days, initial_bet, strategy=FIBONACCI, multiplier=2, commission_rate=0.0,
+                 actual_odds=None, keep_daily=False, chunk_size=CHUNK_SIZE, start=0, stop=None):
+    """按块回放第 start..stop-1 条路径（默认全部），逐块产出 replay_chunk 的结果。"""
+    for combos in combination_chunks(days, no_win_days, chunk_size, start, stop):
+        yield replay_chunk(combos, days, odds, initial_bet, strategy, multiplier, commission_rate,
+                           actual_odds, keep_daily)
+
+
+def chunk_frame(columns):
+    """把一块回放结果转成 DataFrame，未中奖天数/每日盈亏 转为每行一个元组/列表。"""
+    frame = {name: values for name, values in columns.items() if name not in ('未中奖天数', '每日盈亏')}
+    frame = pd.DataFrame(frame)
+    frame.insert(0, '未中奖天数', [tuple(row) for row in columns['未中奖天数'].tolist()])
+    if '每日盈亏' in columns:
+        frame.insert(1, '每日盈亏', columns['每日盈亏'].tolist())
+    return frame
+
+
+def shard_ranges(total, shards):
+    """把 0..total-1 的组合序号切成至多 shards 段连续区间。"""
+    bounds = [total * shard // shards for shard in range(shards + 1)]
+    return [(start, stop) for start, stop in zip(bounds[:-1], bounds[1:]) if start < stop]
+
+
+def _run_sharded(task, total, workers):
+    """按序号区间分片执行 task(start, stop)，按区间顺序返回各片结果。"""
+    if workers <= 1 or total < PARALLEL_MIN_PATHS:
+        return [task(0, total)]
+    ranges = shard_ranges(total, workers * 4)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(task, [start for start, _ in ranges], [stop for _, stop in ranges]))
+
+
+def _table_range(start, stop, odds, days, no_win_days, initial_bet, strategy, multiplier, commission_rate,
+                 actual_odds, keep_daily, chunk_size):
+    frames = [chunk_frame(columns) for columns in replay_paths(
+        odds, days, no_win_days, initial_bet, strategy, multiplier, commission_rate, actual_odds, keep_daily,
+        chunk_size, start, stop)]
+    return pd.concat(frames, ignore_index=True)
+
+
+def path_table(odds, days, no_win_days, initial_bet, strategy=FIBONACCI, multiplier=2, commission_rate=0.0,
+               actual_odds=None, keep_daily=False, chunk_size=CHUNK_SIZE, workers=1):
+    """回放全部路径并拼成一张逐条明细表（只适合路径数不太多时展示用），workers > 1 时多进程分片回放。"""
+    task = partial(_table_range, odds=odds, days=days, no_win_days=no_win_days, initial_bet=initial_bet,
+                   strategy=strategy, multiplier=multiplier, commission_rate=commission_rate,
+                   actual_odds=actual_odds, keep_daily=keep_daily, chunk_size=chunk_size)
+    frames = _run_sharded(task, comb(days, no_win_days), workers)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _take(columns, index):
+    return {name: values[index] for name, values in columns.items()}
+
+
+def _concat(first, second):
+    if first is None:
+        return second
+    return {name: np.concatenate([first[name], second[name]]) for name in first}
+
+
+def _keep_extremes(kept, chunk, top_n, largest):
+    """在已保留的路径和新一块路径中选出总盈亏最小（或最大）的 top_n 条，同值时保留先出现的。"""
+    merged = _concat(kept, chunk)
+    profits = merged['总盈亏']
+    order = np.argsort(-profits if largest else profits, kind='stable')[:top_n]
+    return _take(merged, order)
+
+
+class PathAccumulator:
+    """流式汇总回放结果：按结果值累计出现次数，只保留总盈亏最差/最好的 top_n 条路径。"""
+
+    def __init__(self, top_n=10, columns=('总盈亏',)):
+        self.top_n = top_n
+        self.histograms = {column: {} for column in columns}
+        self.total = 0
+        self.worst = None
+        self.best = None
+
+    def add(self, chunk):
+        """把一块 replay_chunk 的结果并入汇总。"""
+        self.total += len(chunk['总盈亏'])
+        for column, histogram in self.histograms.items():
+            values, counts = np.unique(np.round(chunk[column], 2), return_counts=True)
+            for value, count in zip(values.tolist(), counts.tolist()):
+                histogram[value] = histogram.get(value, 0) + count
+        if self.top_n > 0:
+            self.worst = _keep_extremes(self.worst, chunk, self.top_n, largest=False)
+            self.best = _keep_extremes(self.best, chunk, self.top_n, largest=True)
+        return self
+
+    def merge(self, other):
+        """并入另一段（序号区间排在其后的）汇总结果。"""
+        self.total += other.total
+        for column, histogram in self.histograms.items():
+            for value, count in other.histograms[column].items():
+                histogram[value] = histogram.get(value, 0) + count
+        if self.top_n > 0 and other.worst is not None:
+            self.worst = _keep_extremes(self.worst, other.worst, self.top_n, largest=False)
+            self.best = _keep_extremes(self.best, other.best, self.top_n, largest=True)
+        return self
+
+    def table(self, column='总盈亏', percent_column='百分比'):
+        """某一列的 数值 → 出现次数/百分比 表。"""
+        histogram = self.histograms[column]
+        return value_counts_table(list(histogram.keys()), list(histogram.values()), column, percent_column)
+
+    def worst_paths(self):
+        """总盈亏最差的 top_n 条路径明细。"""
+        return chunk_frame(self.worst)
+
+    def best_paths(self):
+        """总盈亏最好的 top_n 条路径明细。"""
+        return chunk_frame(self.best)
+
+
+def _summarize_range(start, stop, odds, days, no_win_days, initial_bet, strategy, multiplier, commission_rate,
+                     actual_odds, top_n, columns, chunk_size):
+    accumulator = PathAccumulator(top_n, columns)
+    for chunk in replay_paths(odds, days, no_win_days, initial_bet, strategy, multiplier, commission_rate,
+                              actual_odds, chunk_size=chunk_size, start=start, stop=stop):
+        accumulator.add(chunk)
+    return accumulator
+
+
+def summarize_paths(odds, days, no_win_days, initial_bet, strategy=FIBONACCI, multiplier=2, commission_rate=0.0,
+                    actual_odds=None, top_n=10, columns=('总盈亏',), chunk_size=CHUNK_SIZE, workers=1):
+    """流式回放全部路径，只保留各列的结果分布和最差/最好的 top_n 条路径。
+
+    workers > 1 时按字典序序号区间分片到多个进程回放，最后按区间顺序合并各片的汇总，
+    结果与单进程完全相同。
+    """
+    task = partial(_summarize_range, odds=odds, days=days, no_win_days=no_win_days, initial_bet=initial_bet,
+                   strategy=strategy, multiplier=multiplier, commission_rate=commission_rate,
+                   actual_odds=actual_odds, top_n=top_n, columns=columns, chunk_size=chunk_size)
+    parts = _run_sharded(task, comb(days, no_win_days), workers)
+    accumulator = parts[0]
+    for part in parts[1:]:
+        accumulator.merge(part)
+    return accumulator
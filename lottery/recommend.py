@@ -0,0 +1,84 @@
+"""每日最佳投注组合推荐：按历史命中率和期望值给候选投注排序。
+
+先对历史记录按 (赔率区间, 玩法) 做一次汇总得到命中率矩阵（样本少的组合向整体命中率收缩），
+候选投注为历史中出现过的不同 (比赛, 玩法, 赔率) 组合，按所在组合的命中率 × 赔率 计算期望值，
+查表得到各候选的期望值后用堆取出最高的 k 个，耗时与候选数量成线性，排序部分只与 k 的对数成正比。
+"""
+import heapq
+
+import numpy as np
+import pandas as pd
+
+from lottery.risk import ODDS_BUCKETS, odds_bucket
+
+# 命中率向整体命中率收缩时相当于额外的投注次数
+PRIOR_BETS = 20
+# 默认推荐个数
+TOP_K = 3
+
+
+def hit_rate_index(odds, wins, plays=None, prior_bets=PRIOR_BETS):
+    """按 (赔率区间, 玩法) 汇总历史记录，返回命中率索引字典。
+
+    rates/bets 为 [赔率区间, 玩法] 的命中率（样本少的向整体命中率收缩）和投注次数矩阵，
+    plays 为玩法名称，table 为供展示的汇总表。
+    """
+    wins = np.asarray(wins, dtype=bool)
+    buckets = len(ODDS_BUCKETS) - 1
+    bucket_codes = odds_bucket(np.asarray(odds, dtype=float)).codes.astype(np.int64)
+    if plays is None:
+        names = ["全部"]
+        play_codes = np.zeros(len(wins), dtype=np.int64)
+    else:
+        categorical = pd.Categorical(plays)
+        names = [str(name) for name in categorical.categories]
+        play_codes = categorical.codes.astype(np.int64)
+    valid = (bucket_codes >= 0) & (play_codes >= 0)
+    cells = bucket_codes[valid] * len(names) + play_codes[valid]
+    bets = np.bincount(cells, minlength=buckets * len(names)).reshape(buckets, len(names))
+    hits = np.bincount(cells, weights=wins[valid], minlength=buckets * len(names)).reshape(buckets, len(names))
+    overall = wins[valid].mean() if valid.any() else 0.0
+    rates = np.where(bets > 0, (hits + prior_bets * overall) / (bets + prior_bets), np.nan)
+
+    bucket_labels = odds_bucket(np.asarray(ODDS_BUCKETS[:-1])).astype(str)
+    rows, cols = np.nonzero(bets)
+    table = pd.DataFrame({
+        "赔率区间": np.asarray(bucket_labels)[rows],
+        "玩法": np.asarray(names, dtype=object)[cols],
+        "投注次数": bets[rows, cols],
+        "中奖次数": hits[rows, cols].astype(np.int64),
+        "命中率": rates[rows, cols],
+    })
+    return {"rates": rates, "bets": bets, "plays": names, "table": table}
+
+
+def candidates(data, odds_col, play_col=None, match_col=None):
+    """历史中出现过的不同 (比赛, 玩法, 赔率) 组合，去掉赔率缺失或不大于 1 的记录。"""
+    columns = [col for col in (match_col, play_col, odds_col) if col is not None]
+    frame = data[columns].dropna().drop_duplicates()
+    frame = frame[frame[odds_col].astype(float) > 1]
+    return frame.reset_index(drop=True)
+
+
+def top_recommendations(index, candidate_frame, odds_col, play_col=None, k=TOP_K):
+    """按期望值（命中率 × 赔率）取前 k 个候选，返回带历史投注次数、命中率和期望值的表。"""
+    odds = candidate_frame[odds_col].to_numpy(dtype=float)
+    bucket_codes = odds_bucket(odds).codes.astype(np.int64)
+    if play_col is None:
+        play_codes = np.zeros(len(odds), dtype=np.int64)
+    else:
+        play_codes = pd.Categorical(candidate_frame[play_col].astype(str), categories=index["plays"]).codes
+        play_codes = play_codes.astype(np.int64)
+    # 没有对应历史记录的候选不参与排序
+    valid = np.flatnonzero((bucket_codes >= 0) & (play_codes >= 0))
+    hit_rate = np.full(len(odds), np.nan)
+    hit_rate[valid] = index["rates"][bucket_codes[valid], play_codes[valid]]
+    ev = hit_rate * odds
+    valid = valid[~np.isnan(ev[valid])]
+    # 期望值相同时序号小的在前：堆中按 (期望值, -序号) 比较
+    best = [-negative for _, negative in heapq.nlargest(int(k), zip(ev[valid].tolist(), (-valid).tolist()))]
+    table = candidate_frame.iloc[best].reset_index(drop=True)
+    table["历史投注次数"] = index["bets"][bucket_codes[best], play_codes[best]]
+    table["预计胜率"] = hit_rate[best]
+    table["期望值EV"] = ev[best]
+    return table
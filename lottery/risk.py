@@ -0,0 +1,101 @@
+"""历史投注数据的风险指标。
+
+全部为整列向量运算：连败长度用游程编码（找出胜负变化的位置，相邻位置之差即各段长度）；
+累计盈亏和回撤一次算出（累计和 + 累计最大值）；按日期、赔率区间、组别的分组统计只做一次
+groupby 得到三维汇总，各维度的统计再由这个小表相加得到。
+"""
+import numpy as np
+import pandas as pd
+
+from lottery.history import WIN_VALUES
+
+# 赔率区间的分界
+ODDS_BUCKETS = [1.0, 1.5, 2.0, 2.5, 3.0, 4.0, 5.0, 10.0, np.inf]
+
+
+def win_flags(data, outcome_col=None, profit_col=None):
+    """每笔投注是否中奖（布尔数组）：有中奖结果列时按其取值判断，否则按盈亏是否为正。"""
+    if outcome_col is not None:
+        return data[outcome_col].isin(WIN_VALUES).to_numpy()
+    return (data[profit_col] > 0).to_numpy()
+
+
+def losing_streaks(wins):
+    """游程编码统计连败：返回 (最长连败, 各连败长度 → 出现次数 的表)。"""
+    losses = ~np.asarray(wins, dtype=bool)
+    # 连败段的起点和终点：在前后补 False 后，相邻元素不同的位置
+    edges = np.flatnonzero(np.diff(np.concatenate(([False], losses, [False])).astype(np.int8)))
+    lengths = edges[1::2] - edges[::2]
+    if len(lengths) == 0:
+        return 0, pd.DataFrame({"连败长度": [], "出现次数": []}, dtype=np.int64)
+    values, counts = np.unique(lengths, return_counts=True)
+    return int(lengths.max()), pd.DataFrame({"连败长度": values, "出现次数": counts})
+
+
+def drawdown_curve(profit):
+    """一次算出累计盈亏、回撤（累计盈亏 - 此前最高点，<= 0）和最大回撤金额。"""
+    cumulative = np.cumsum(np.asarray(profit, dtype=float))
+    # 起点（尚未投注时累计盈亏为 0）也算作最高点
+    running_max = np.maximum.accumulate(np.maximum(cumulative, 0.0))
+    drawdown = cumulative - running_max
+    max_drawdown = float(-drawdown.min()) if len(drawdown) else 0.0
+    return cumulative, drawdown, max_drawdown
+
+
+def odds_bucket(odds):
+    """把赔率归入 ODDS_BUCKETS 划分的区间。"""
+    return pd.cut(odds, ODDS_BUCKETS, right=False)
+
+
+def breakdown(data, profit_col, wins, odds_col=None, date_col=None, group_col=None, stake_col=None):
+    """按日期、赔率区间、组别分组统计投注次数、中奖次数、投注额、盈亏和中奖率。
+
+    只对存在的维度做一次 groupby，返回 {维度名: 汇总表}，各表由三维汇总按该维度相加得到。
+    """
+    keys = {}
+    if date_col is not None:
+        dates = data[date_col]
+        keys["日期"] = dates.dt.normalize() if pd.api.types.is_datetime64_any_dtype(dates) else dates
+    if odds_col is not None:
+        keys["赔率区间"] = odds_bucket(data[odds_col])
+    if group_col is not None:
+        keys["组别"] = data[group_col]
+    if not keys:
+        return {}
+
+    # reset_index 而不是 to_numpy：保留分类类型（赔率区间），groupby 按分类编码分组，速度快得多
+    frame = pd.DataFrame({name: values.reset_index(drop=True) for name, values in keys.items()})
+    frame["投注次数"] = 1
+    frame["中奖次数"] = wins.astype(np.int64)
+    frame["盈亏"] = data[profit_col].to_numpy(dtype=float)
+    if stake_col is not None:
+        frame["投注额"] = data[stake_col].to_numpy(dtype=float)
+    # 某一维度缺失（赔率缺失或小于 1、日期无法解析、组别为空）的记录只在该维度的表中不计入，其他维度照常统计
+    cube = frame.groupby(list(keys), observed=True, sort=False, dropna=False).sum()
+
+    tables = {}
+    for name in keys:
+        table = cube.groupby(level=name, observed=True).sum().sort_index()
+        table["中奖率"] = table["中奖次数"] / table["投注次数"]
+        if stake_col is not None:
+            table["回报率"] = table["盈亏"] / table["投注额"].where(table["投注额"] != 0)
+        tables[name] = table.reset_index()
+    return tables
+
+
+def bucket_win_rate(odds, wins):
+    """每条记录所在赔率区间的历史中奖率（用作该赔率下的预期胜率）。"""
+    codes = odds_bucket(odds).codes
+    bets = np.bincount(codes, minlength=len(ODDS_BUCKETS) - 1)
+    hits = np.bincount(codes, weights=wins, minlength=len(ODDS_BUCKETS) - 1)
+    rates = hits / np.maximum(bets, 1)
+    return rates[codes]
+
+
+def bootstrap_sample(data, odds_col, outcome_col=None, profit_col=None):
+    """按时间顺序取出重抽样用的 (赔率, 是否中奖, 所在赔率区间的中奖率) 数组，去掉赔率缺失或不大于 1 的记录。"""
+    odds = data[odds_col].to_numpy(dtype=float)
+    wins = win_flags(data, outcome_col, profit_col)
+    valid = odds > 1
+    odds, wins = odds[valid], wins[valid]
+    return odds, wins, bucket_win_rate(odds, wins)
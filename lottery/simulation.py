@@ -0,0 +1,671 @@
+"""计划单概率测算的投注策略模拟。
+
+所有模拟次数同时推进：资金、当日亏损、是否仍在投注等都是按模拟次数排列的 NumPy 数组，
+逐天、逐次投注对整批模拟做向量运算，规则与逐次模拟一次运行的写法一致（同时逐注累计最大回撤、
+最大单注、破产/达到目标的天数，不保存路径）：
+- 马丁格尔：每天最多连投 bets_per_day 次，每次投注额使中奖后收回当日亏损并盈利 daily_target，
+  资金不足时投入剩余全部资金；当天中奖即停，资金耗尽即结束整个模拟；
+- 固定投注 / 凯利 / 比例投注：每天独立投注 bets_per_day 次，资金不足时投入剩余全部资金；
+- 每天结束后达到总目标盈利即停止该次模拟。
+以下各种模拟都由同一个内核（_step_rows）推进，只是每注的赔率和开奖结果的来源不同。
+
+大量模拟时按固定大小分块，每块使用由同一个种子派生（SeedSequence.spawn）的独立随机数流，
+各块可分到多个进程运行；给定种子时结果逐位可复现，且与进程数无关。
+自适应模式（simulate_adaptive）逐批模拟，各项概率的置信区间都足够窄时自动停止。
+破产是稀有事件时用重要性抽样（importance_ruin）：降低开奖的中奖概率并按似然比加权。
+上传了历史记录时可按历史赔率/中奖结果块自助重抽样（simulate_bootstrap），不再假设固定赔率和胜率。
+参数扫描（simulate_grid）把多组参数的模拟叠成一批同时推进，各组参数共用同一组随机数；
+策略对比（compare_strategies）让各策略在同一组开奖结果上运行，按运行配对比较差异。
+
+投注额只由资金、赔率和策略参数决定，资金只会落在有限个取值上，因此也可以不抽样，
+逐天传播"资金 → 概率"分布，精确得到达到目标、破产、最终盈利为正的概率（exact_outcome）。
+"""
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+MARTINGALE = "马丁格尔策略 (翻倍投注)"
+FLAT = "固定投注 (定额投注)"
+KELLY = "凯利策略 (凯利公式投注)"
+PROPORTIONAL = "比例投注 (每次投入固定比例资金)"
+STRATEGIES = [FLAT, MARTINGALE, KELLY, PROPORTIONAL]
+
+# 最终资金不超过该值视为破产（浮点误差）
+BANKRUPT_THRESHOLD = 0.0001
+# 每块的模拟次数，每块对应一个独立的随机数流
+BLOCK_RUNS = 50000
+# 模拟次数达到该值才分块到多进程，否则进程启动开销大于收益
+PARALLEL_MIN_RUNS = 200000
+# 自适应模拟每批的模拟次数和默认的模拟次数上限
+ADAPTIVE_BATCH_RUNS = 10000
+ADAPTIVE_MAX_RUNS = 1000000
+# 95% 置信区间对应的正态分位数
+CONFIDENCE_Z = 1.96
+# 历史重抽样时每段连续历史记录的默认长度
+BOOTSTRAP_BLOCK_LENGTH = 10
+# 重要性抽样：交叉熵法每轮试探的模拟次数、精英样本比例和最多轮数
+IS_PILOT_RUNS = 5000
+IS_ELITE_SHARE = 0.1
+IS_MAX_ITERATIONS = 10
+# 精确计算时资金按分（两位小数）合并为同一状态：不同投注顺序得到的资金只差浮点误差，
+# 资金不足全押后中奖等产生的零散金额也不会使状态数无限增长
+CAPITAL_DECIMALS = 2
+# 精确计算时允许的最大资金状态数
+MAX_STATES = 300000
+
+
+def _track(track, index, capital, stake, wins, log_ratio=None):
+    """逐注更新峰值资金、最大回撤和最大单注；index 为投注的运行在 track 各数组中的位置，None 表示全部。
+
+    重要性抽样时 log_ratio 为 [未中奖, 中奖] 的对数似然比，同时累计各运行的对数权重、中奖次数和投注次数。
+    """
+    if index is None:
+        np.maximum(track["max_stake"], stake, out=track["max_stake"])
+        np.maximum(track["peak"], capital, out=track["peak"])
+        np.maximum(track["max_drawdown"], track["peak"] - capital, out=track["max_drawdown"])
+        index = slice(None)
+    else:
+        track["max_stake"][index] = np.maximum(track["max_stake"][index], stake)
+        peak = np.maximum(track["peak"][index], capital)
+        track["peak"][index] = peak
+        track["max_drawdown"][index] = np.maximum(track["max_drawdown"][index], peak - capital)
+    if log_ratio is not None:
+        track["log_weight"][index] += log_ratio[wins.astype(np.int64)]
+        track["wins"][index] += wins
+        track["bets"][index] += 1
+
+
+def _martingale_stake(capital, day_loss, odds, daily_target):
+    """马丁策略本注的投注额：中奖后收回当日亏损并盈利 daily_target，资金不足（或赔率不大于 1）时投入剩余全部资金。"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        required = np.where(odds > 1, (day_loss + daily_target) / (odds - 1), capital)
+    return np.where(capital >= required, required, capital)
+
+
+def _stake_rule(strategy, odds, win_prob, flat_stake, bet_percent):
+    """非马丁策略每次投注额的计算方式 stake_of(资金, 查表键)；返回 None 表示不投注。
+
+    odds、win_prob 可以是数组（参数扫描按行、历史重抽样按记录取值），此时凯利系数按查表键取对应的元素。
+    """
+    if "固定投注" in strategy and "定额" in strategy:
+        stake = float(flat_stake) if flat_stake is not None else 0.0
+        return lambda capital, key: stake
+    if "凯利" in strategy:
+        # 没有优势(win_prob <= 1/odds)时凯利系数 <= 0，不投注（数组中这样的元素投注额为 0）
+        odds = np.asarray(odds, dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            kelly_fraction = np.where(odds > 1, (np.asarray(win_prob) * odds - 1) / (odds - 1), 0.0)
+        kelly_fraction = np.maximum(kelly_fraction, 0.0)
+        if not kelly_fraction.any():
+            return None
+        if kelly_fraction.ndim == 0:
+            fraction = float(kelly_fraction)
+            return lambda capital, key: capital * fraction
+        return lambda capital, key: capital * kelly_fraction[key]
+    if "比例投注" in strategy:
+        if bet_percent is None or bet_percent <= 0:
+            return None
+        return lambda capital, key: capital * bet_percent
+    # 未匹配任何策略时按固定投注处理，未给定投注额则每次投入当前资金的 5%
+    if flat_stake is not None:
+        return lambda capital, key: float(flat_stake)
+    return lambda capital, key: 0.05 * capital
+
+
+def _step_rows(draw, stake_of, days, max_bets, capital, row_bets, martingale, total_target, daily_target,
+               log_ratio=None):
+    """所有模拟共用的内核：逐天、逐注同时推进各行（每行一次运行，每日投注次数可以不同）。
+
+    draw(day, bet, rows) 返回这些行本注的 (赔率, 是否中奖, 查表键)，赔率可以是标量；非马丁策略的投注额为
+    stake_of(资金, 查表键)，为 None 时不投注。log_ratio 见 _track。返回与 simulate_runs 相同的结果字典
+    （给定 log_ratio 时另有 weight、wins、bets）。
+    """
+    runs = len(row_bets)
+    final = np.full(runs, float(capital))
+    achieved = np.zeros(runs, dtype=bool)
+    # 仍在模拟中（未达到目标、未因资金耗尽而结束）的行号及其资金，结束的行移出数组
+    active = np.arange(runs)
+    current = final.copy()
+    # 仍在模拟中的行的峰值资金、最大回撤、最大单注，与 current 一起压缩；结束时写入 stats
+    track = {"peak": current.copy(), "max_drawdown": np.zeros(runs), "max_stake": np.zeros(runs)}
+    stats = {"max_drawdown": np.zeros(runs), "max_stake": np.zeros(runs)}
+    if log_ratio is not None:
+        for name, dtype in (("log_weight", float), ("wins", np.int64), ("bets", np.int64)):
+            track[name] = np.zeros(runs, dtype=dtype)
+            stats[name] = np.zeros(runs, dtype=dtype)
+    ruin_day = np.zeros(runs, dtype=np.int64)
+    target_day = np.zeros(runs, dtype=np.int64)
+    # 各行每日投注次数相同时不必逐注筛选还要投注的行
+    same_bets = bool(np.all(row_bets == max_bets))
+    bets_per_day = max_bets if martingale or stake_of is not None else 0
+
+    for day in range(1, int(days) + 1):
+        if len(active) == 0:
+            break
+        # betting 为 active 中当天仍在投注的位置，None 表示全部；马丁策略第一注全部下，之后只对还在连投的计算
+        betting = None
+        day_loss = np.zeros(len(active))
+        for bet in range(bets_per_day):
+            if not same_bets:
+                positions = np.arange(len(active)) if betting is None else betting
+                more = row_bets[active[positions]] > bet
+                betting = positions[more]
+                if martingale:
+                    day_loss = day_loss[more]
+                if len(betting) == 0:
+                    break
+            rows = active if betting is None else active[betting]
+            balance = current if betting is None else current[betting]
+            bet_odds, wins, key = draw(day - 1, bet, rows)
+            if martingale:
+                stake = _martingale_stake(balance, day_loss, bet_odds, daily_target)
+            else:
+                # 资金耗尽的行投注额为 0，不再变化
+                stake = np.minimum(stake_of(balance, key), balance)
+            # 扣除投注额，中奖的按赔率返还（含本金）；整列乘以是否中奖，比按布尔掩码取出再写回快，
+            # 未中奖的加 0 结果不变
+            balance = balance - stake
+            balance += stake * bet_odds * wins
+            if betting is None:
+                current = balance
+            else:
+                current[betting] = balance
+            _track(track, betting, balance, stake, wins, log_ratio)
+            if martingale:
+                # 中奖即完成当日目标；未中奖且资金耗尽也停止当天投注
+                keep = ~wins & (balance > 0)
+                betting = np.flatnonzero(keep) if betting is None else betting[keep]
+                day_loss = (day_loss + stake)[keep]
+                if len(betting) == 0:
+                    break
+        # 资金耗尽的行不会再变化：马丁策略直接结束（不再检查目标），其他策略检查完目标后结束
+        stopped = current <= 0
+        reached = current - capital >= total_target
+        if martingale:
+            reached &= ~stopped
+        finished = stopped | reached
+        # 浮点误差下资金可能略大于 0 而未结束，破产天数按破产阈值记录且只记第一次
+        ruined = (current <= BANKRUPT_THRESHOLD) & (ruin_day[active] == 0)
+        ruin_day[active[ruined]] = day
+        if finished.any():
+            final[active[finished]] = current[finished]
+            achieved[active[reached]] = True
+            target_day[active[reached]] = day
+            for name in stats:
+                stats[name][active[finished]] = track[name][finished]
+            active = active[~finished]
+            current = current[~finished]
+            track = {name: values[~finished] for name, values in track.items()}
+    final[active] = current
+    for name in stats:
+        stats[name][active] = track[name]
+
+    results = {
+        "final_capital": final,
+        "final_profit": final - capital,
+        "achieved_target": achieved,
+        "bankrupt": final <= BANKRUPT_THRESHOLD,
+        "max_drawdown": stats["max_drawdown"],
+        "max_stake": stats["max_stake"],
+        "ruin_day": ruin_day,
+        "target_day": target_day,
+    }
+    if log_ratio is not None:
+        results["weight"] = np.exp(stats["log_weight"])
+        results["wins"] = stats["wins"]
+        results["bets"] = stats["bets"]
+    return results
+
+
+def _simulate_fixed(uniform, runs, capital, odds, win_prob, days, bets_per_day, strategy, total_target,
+                    daily_target=None, flat_stake=None, bet_percent=None, sampling_prob=None):
+    """固定赔率/胜率下模拟 runs 次运行，uniform(day, bet, rows) 给出这些运行本注开奖用的 [0, 1) 随机数。"""
+    log_ratio = None
+    draw_prob = win_prob
+    if sampling_prob is not None:
+        draw_prob = sampling_prob
+        with np.errstate(divide="ignore"):
+            log_ratio = np.log([(1 - win_prob) / (1 - sampling_prob), win_prob / sampling_prob])
+    martingale = "马丁" in strategy
+    stake_of = None if martingale else _stake_rule(strategy, odds, win_prob, flat_stake, bet_percent)
+
+    def draw(day, bet, rows):
+        return odds, uniform(day, bet, rows) < draw_prob, None
+
+    return _step_rows(draw, stake_of, days, int(bets_per_day), capital, np.full(int(runs), int(bets_per_day)),
+                      martingale, total_target, daily_target, log_ratio)
+
+
+def simulate_runs(runs, capital, odds, win_prob, days, bets_per_day, strategy, total_target, daily_target=None,
+                  flat_stake=None, bet_percent=None, rng=None, sampling_prob=None):
+    """同时模拟 runs 次完整运行。
+
+    返回字典：final_capital 最终资金、final_profit 最终盈亏、achieved_target 是否达到目标盈利、
+    bankrupt 是否破产，以及逐注在线累计的路径统计（不保存路径）：max_drawdown 最大回撤（相对此前
+    最高资金）、max_stake 最大单注、ruin_day 破产的天数、target_day 达到目标的天数（未发生为 0），
+    均为长度 runs 的数组。
+
+    给定 sampling_prob 时按该中奖概率开奖（投注额仍按真实胜率计算），另外返回 weight 似然比权重、
+    wins 中奖次数、bets 投注次数，供重要性抽样加权估计。
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    return _simulate_fixed(lambda day, bet, rows: rng.random(len(rows)), runs, capital, odds, win_prob, days,
+                           bets_per_day, strategy, total_target, daily_target, flat_stake, bet_percent,
+                           sampling_prob)
+
+
+def path_quantiles(results, quantiles=(0.5, 0.9, 0.95, 0.99)):
+    """最大回撤、最大单注的分位数表，用于估算需要准备的资金（如 99% 的运行最大单注不超过多少）。"""
+    table = pd.DataFrame({
+        "最大回撤": np.quantile(results["max_drawdown"], quantiles),
+        "最大单注": np.quantile(results["max_stake"], quantiles),
+    }, index=[f"{q:.0%} 分位" for q in quantiles])
+    table.loc["最大值"] = [results["max_drawdown"].max(), results["max_stake"].max()]
+    return table
+
+
+def day_counts(day, days):
+    """破产/达到目标天数的分布：第 1..days 天各有多少次运行发生（未发生的 0 不计入）。"""
+    counts = np.bincount(day, minlength=int(days) + 1)[1:]
+    return pd.DataFrame({"天数": np.arange(1, len(counts) + 1), "次数": counts})
+
+
+def tilted_sampling_prob(capital, odds, win_prob, days, bets_per_day, strategy, total_target, daily_target=None,
+                         flat_stake=None, bet_percent=None, rng=None, pilot_runs=IS_PILOT_RUNS,
+                         elite_share=IS_ELITE_SHARE, max_iterations=IS_MAX_ITERATIONS):
+    """交叉熵法选择重要性抽样的中奖概率，使破产不再是稀有事件。
+
+    每轮按当前中奖概率试探 pilot_runs 次，取最终资金最低的 elite_share 比例（破产足够多时取全部破产运行）
+    作为精英样本，新的中奖概率为精英样本按似然比加权的中奖频率；只向降低中奖概率的方向调整。
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    sampling_prob = win_prob
+    for _ in range(max_iterations):
+        pilot = simulate_runs(pilot_runs, capital, odds, win_prob, days, bets_per_day, strategy, total_target,
+                              daily_target, flat_stake, bet_percent, rng, sampling_prob)
+        enough = pilot["bankrupt"].sum() >= elite_share * pilot_runs
+        if enough:
+            elite = pilot["bankrupt"]
+        else:
+            elite = pilot["final_capital"] <= np.quantile(pilot["final_capital"], elite_share)
+        weight = pilot["weight"][elite]
+        bets = (weight * pilot["bets"][elite]).sum()
+        if bets > 0:
+            sampling_prob = float(np.clip((weight * pilot["wins"][elite]).sum() / bets, 0.01 * win_prob, win_prob))
+        if enough:
+            break
+    return sampling_prob
+
+
+def importance_ruin(runs, capital, odds, win_prob, days, bets_per_day, strategy, total_target, daily_target=None,
+                    flat_stake=None, bet_percent=None, sampling_prob=None, seed=None, z=CONFIDENCE_Z):
+    """用重要性抽样估计破产概率：按降低后的中奖概率开奖，再用似然比加权，估计无偏。
+
+    sampling_prob 为 None 时由 tilted_sampling_prob 自动选择。返回字典：estimate 破产概率、half_width
+    置信区间半宽、relative_error 相对误差（标准误 / 估计值）、sampling_prob 抽样用的中奖概率、
+    hits 抽样中破产的次数、runs 模拟次数。
+    """
+    rng = np.random.default_rng(seed)
+    runs = int(runs)
+    if not 0 < win_prob < 1:
+        # 必中或必不中时没有可调整的余地，直接模拟
+        sampling_prob = win_prob
+        ruined = simulate_runs(runs, capital, odds, win_prob, days, bets_per_day, strategy, total_target,
+                               daily_target, flat_stake, bet_percent, rng)["bankrupt"]
+        values = ruined.astype(float)
+    else:
+        if sampling_prob is None:
+            sampling_prob = tilted_sampling_prob(capital, odds, win_prob, days, bets_per_day, strategy, total_target,
+                                                 daily_target, flat_stake, bet_percent, rng)
+        results = simulate_runs(runs, capital, odds, win_prob, days, bets_per_day, strategy, total_target,
+                                daily_target, flat_stake, bet_percent, rng, sampling_prob)
+        ruined = results["bankrupt"]
+        values = results["weight"] * ruined
+    estimate = float(values.mean())
+    std_error = float(values.std(ddof=1) / np.sqrt(runs)) if runs > 1 else float("nan")
+    return {
+        "estimate": estimate,
+        "half_width": z * std_error,
+        "relative_error": std_error / estimate if estimate > 0 else float("nan"),
+        "sampling_prob": sampling_prob,
+        "hits": int(ruined.sum()),
+        "runs": runs,
+    }
+
+
+def block_sizes(runs):
+    """把 runs 次模拟切成若干块，每块 BLOCK_RUNS 次（最后一块可能较少）。"""
+    runs = int(runs)
+    return [min(BLOCK_RUNS, runs - start) for start in range(0, runs, BLOCK_RUNS)]
+
+
+def _simulate_block(seed_sequence, runs, capital, odds, win_prob, days, bets_per_day, strategy, total_target,
+                    daily_target, flat_stake, bet_percent):
+    return simulate_runs(runs, capital, odds, win_prob, days, bets_per_day, strategy, total_target, daily_target,
+                         flat_stake, bet_percent, np.random.default_rng(seed_sequence))
+
+
+def simulate_parallel(runs, capital, odds, win_prob, days, bets_per_day, strategy, total_target, daily_target=None,
+                      flat_stake=None, bet_percent=None, seed=None, workers=1):
+    """分块模拟 runs 次完整运行，workers > 1 时各块分到多个进程，按块顺序拼接结果。
+
+    每块的随机数流由 SeedSequence(seed) 按块序号派生，同一种子的结果与 workers 无关；
+    seed 为 None 时每次使用新的随机种子。返回值与 simulate_runs 相同。
+    """
+    sizes = block_sizes(runs)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    task = partial(_simulate_block, capital=capital, odds=odds, win_prob=win_prob, days=days,
+                   bets_per_day=bets_per_day, strategy=strategy, total_target=total_target,
+                   daily_target=daily_target, flat_stake=flat_stake, bet_percent=bet_percent)
+    if workers <= 1 or int(runs) < PARALLEL_MIN_RUNS:
+        parts = list(map(task, seeds, sizes))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(task, seeds, sizes))
+    return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+
+
+def wilson_interval(successes, runs, z=CONFIDENCE_Z):
+    """二项比例的 Wilson 置信区间 (下限, 上限)，估计值为 0 或 1 时也有合理的宽度。"""
+    rate = successes / runs
+    denominator = 1 + z ** 2 / runs
+    center = (rate + z ** 2 / (2 * runs)) / denominator
+    half_width = z * np.sqrt(rate * (1 - rate) / runs + z ** 2 / (4 * runs ** 2)) / denominator
+    return center - half_width, center + half_width
+
+
+def _outcome_counts(results):
+    """达到目标、破产、最终盈利为正的次数。"""
+    return {
+        "achieved_target": int(results["achieved_target"].sum()),
+        "bankrupt": int(results["bankrupt"].sum()),
+        "profit_positive": int((results["final_profit"] > 0).sum()),
+    }
+
+
+def _rates_from_counts(counts, runs, z=CONFIDENCE_Z):
+    return {name: (count / runs,) + wilson_interval(count, runs, z) for name, count in counts.items()}
+
+
+def estimate_rates(results, z=CONFIDENCE_Z):
+    """模拟结果中达到目标、破产、最终盈利为正的比例及其置信区间：{名称: (估计值, 下限, 上限)}。"""
+    return _rates_from_counts(_outcome_counts(results), len(results["final_profit"]), z)
+
+
+def concat_results(parts):
+    """按字段拼接逐批模拟的结果。"""
+    return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+
+
+def within_tolerance(rates, tolerance):
+    """estimate_rates 结果中各项概率置信区间的半宽是否都不超过 tolerance。"""
+    return all((high - low) / 2 <= tolerance for _, low, high in rates.values())
+
+
+def runs_for_tolerance(tolerance, z=CONFIDENCE_Z):
+    """概率为 50%（方差最大）时置信区间半宽不超过 tolerance 大约需要的模拟次数。"""
+    return int(np.ceil((z / tolerance) ** 2 / 4))
+
+
+def simulate_adaptive(capital, odds, win_prob, days, bets_per_day, strategy, total_target, daily_target=None,
+                      flat_stake=None, bet_percent=None, tolerance=0.005, max_runs=ADAPTIVE_MAX_RUNS, seed=None,
+                      batch_runs=ADAPTIVE_BATCH_RUNS, z=CONFIDENCE_Z):
+    """逐批模拟，每批后产出 (本批结果, 累计的 estimate_rates 结果, 是否停止)。
+
+    各项概率置信区间的半宽都不超过 tolerance，或累计达到 max_runs 次时停止（是否收敛由调用方对最后的
+    累计结果调用 within_tolerance 判断）。停止规则只用累计的次数计算，不拼接各批结果；需要全部结果时
+    由调用方收集各批后用 concat_results 拼接一次。
+    第 i 批使用 SeedSequence(seed) 派生的第 i 个随机数流，同一种子的结果可复现。
+    """
+    root = np.random.SeedSequence(seed)
+    counts = dict.fromkeys(("achieved_target", "bankrupt", "profit_positive"), 0)
+    runs = 0
+    while runs < max_runs:
+        size = min(batch_runs, int(max_runs) - runs)
+        batch = simulate_runs(size, capital, odds, win_prob, days, bets_per_day, strategy, total_target,
+                              daily_target, flat_stake, bet_percent, np.random.default_rng(root.spawn(1)[0]))
+        runs += size
+        for name, count in _outcome_counts(batch).items():
+            counts[name] += count
+        rates = _rates_from_counts(counts, runs, z)
+        done = runs >= max_runs or within_tolerance(rates, tolerance)
+        yield batch, rates, done
+        if done:
+            break
+
+
+def _day_uniforms(day_seeds, bets_per_day, runs, antithetic=False):
+    """共用随机数：返回 uniform(day, bet)，即第 day 天第 bet 注各次运行的 [0, 1) 随机数。
+
+    第 day 天的随机数由 day_seeds[day] 按需生成，只保存当天 (投注次数, 运行次数) 的一块，
+    不保存整张 (天数, 投注次数, 运行次数) 的表；用同一组 day_seeds 再生成（如各策略分别模拟）得到的随机数完全相同。
+    antithetic=True 时 runs 为偶数，后一半运行使用前一半的对偶随机数 1 - u。
+    """
+    block = {}
+
+    def uniform(day, bet):
+        if block.get("day") != day:
+            rng = np.random.default_rng(day_seeds[day])
+            if antithetic:
+                half = rng.random((bets_per_day, runs // 2))
+                block.update(day=day, values=np.concatenate([half, 1 - half], axis=1))
+            else:
+                block.update(day=day, values=rng.random((bets_per_day, runs)))
+        return block["values"][bet]
+
+    return uniform
+
+
+def _simulate_rows(uniform, days, max_bets, capital, row_odds, row_win_prob, row_bets, row_run, strategy,
+                   total_target, daily_target, flat_stake, bet_percent):
+    """按共用随机数 uniform(day, bet)（见 _day_uniforms）模拟各行，每行的赔率/胜率/每日投注次数可以不同。"""
+    martingale = "马丁" in strategy
+    stake_of = None if martingale else _stake_rule(strategy, row_odds, row_win_prob, flat_stake, bet_percent)
+
+    def draw(day, bet, rows):
+        return row_odds[rows], uniform(day, bet)[row_run[rows]] < row_win_prob[rows], rows
+
+    return _step_rows(draw, stake_of, days, max_bets, capital, row_bets, martingale, total_target, daily_target)
+
+
+def simulate_grid(runs, capital, odds, win_prob, days, bets_per_day, strategy, total_target, daily_target=None,
+                  flat_stake=None, bet_percent=None, seed=None):
+    """一次模拟多组参数：odds、win_prob、bets_per_day 可以是等长数组，每个元素为一组参数。
+
+    每组参数模拟 runs 次，所有组合共用同一组随机数（第 i 次运行第 d 天第 b 次投注的随机数相同），
+    组合之间的差异只来自参数本身。返回字典：achieved_target、bankrupt、profit_positive、expected_profit，
+    均为按参数组合排列的数组。
+    """
+    odds, win_prob, bets_per_day = np.broadcast_arrays(np.atleast_1d(np.asarray(odds, dtype=float)),
+                                                       np.atleast_1d(np.asarray(win_prob, dtype=float)),
+                                                       np.atleast_1d(np.asarray(bets_per_day, dtype=np.int64)))
+    runs = int(runs)
+    cells = len(odds)
+    max_bets = int(bets_per_day.max())
+    uniform = _day_uniforms(np.random.SeedSequence(seed).spawn(int(days)), max_bets, runs)
+    # 第 row 行为第 row // runs 组参数的第 row % runs 次运行
+    results = _simulate_rows(uniform, int(days), max_bets, capital, np.repeat(odds, runs), np.repeat(win_prob, runs),
+                             np.repeat(bets_per_day, runs), np.tile(np.arange(runs), cells), strategy, total_target,
+                             daily_target, flat_stake, bet_percent)
+    shape = (cells, runs)
+    profit = results["final_profit"].reshape(shape)
+    return {
+        "achieved_target": results["achieved_target"].reshape(shape).mean(axis=1),
+        "bankrupt": results["bankrupt"].reshape(shape).mean(axis=1),
+        "profit_positive": (profit > 0).mean(axis=1),
+        "expected_profit": profit.mean(axis=1),
+    }
+
+
+def compare_strategies(runs, capital, odds, win_prob, days, bets_per_day, strategies, total_target, daily_target=None,
+                       flat_stake=None, bet_percent=None, seed=None, antithetic=False):
+    """在同一组开奖结果上模拟多种策略，返回 {策略: 与 simulate_runs 相同的结果字典}。
+
+    各策略第 i 次运行使用完全相同的随机数，策略之间的差异可按运行配对比较（见 paired_difference）。
+    antithetic=True 时后一半运行使用前一半的对偶随机数 1 - u，进一步降低估计的方差；
+    此时运行次数为奇数则加 1，保证第 i 次与第 i + runs/2 次恰好互为对偶。
+    """
+    runs = int(runs)
+    if antithetic:
+        runs += runs % 2
+    # 各天的随机数流只派生一次，各策略按同一组种子逐天重新生成，看到的开奖随机数完全相同
+    day_seeds = np.random.SeedSequence(seed).spawn(int(days))
+    results = {}
+    for strategy in strategies:
+        uniform = _day_uniforms(day_seeds, int(bets_per_day), runs, antithetic)
+        results[strategy] = _simulate_fixed(lambda day, bet, rows: uniform(day, bet)[rows], runs, capital, odds,
+                                            win_prob, days, bets_per_day, strategy, total_target, daily_target,
+                                            flat_stake, bet_percent)
+    return results
+
+
+def simulate_bootstrap(runs, capital, history_odds, history_wins, days, bets_per_day, strategy, total_target,
+                       daily_target=None, flat_stake=None, bet_percent=None, history_win_prob=None,
+                       block_length=BOOTSTRAP_BLOCK_LENGTH, seed=None):
+    """按历史投注记录做块自助重抽样模拟：每注的赔率和是否中奖取自历史记录，而不是固定赔率/胜率。
+
+    每次运行的投注序列由若干段长度为 block_length 的连续历史记录拼成（到末尾后接回开头），
+    保留历史中的连中/连败结构；各段起点在模拟开始前一次抽好。凯利策略按 history_win_prob
+    （每条记录对应的预期胜率，默认为历史整体中奖率）计算投注比例。返回值与 simulate_runs 相同。
+    """
+    history_odds = np.asarray(history_odds, dtype=float)
+    history_wins = np.asarray(history_wins, dtype=bool)
+    if history_win_prob is None:
+        history_win_prob = np.full(len(history_odds), history_wins.mean())
+    runs = int(runs)
+    bets_per_day = int(bets_per_day)
+    block_length = max(1, min(int(block_length), len(history_odds)))
+    blocks = -(-int(days) * bets_per_day // block_length)
+    starts = np.random.default_rng(seed).integers(0, len(history_odds), (runs, blocks))
+    martingale = "马丁" in strategy
+    stake_of = None if martingale else _stake_rule(strategy, history_odds, np.asarray(history_win_prob), flat_stake,
+                                                   bet_percent)
+
+    def draw(day, bet, rows):
+        step = day * bets_per_day + bet
+        index = (starts[rows, step // block_length] + step % block_length) % len(history_odds)
+        return history_odds[index], history_wins[index], index
+
+    return _step_rows(draw, stake_of, int(days), bets_per_day, capital, np.full(runs, bets_per_day), martingale,
+                      total_target, daily_target)
+
+
+def paired_difference(values, baseline, antithetic=False, z=CONFIDENCE_Z):
+    """按运行配对的平均差值 mean(values - baseline) 及其置信区间半宽。
+
+    对偶模拟时第 i 次与第 i + runs/2 次运行不独立，按每对的平均值估计方差
+    （compare_strategies 在对偶模拟时保证运行次数为偶数）。
+    """
+    difference = np.asarray(values, dtype=float) - np.asarray(baseline, dtype=float)
+    if antithetic and len(difference) >= 4:
+        pairs = len(difference) // 2
+        difference = (difference[:pairs] + difference[pairs:2 * pairs]) / 2
+    if len(difference) < 2:
+        return float(difference.mean()), float("nan")
+    return float(difference.mean()), float(z * difference.std(ddof=1) / np.sqrt(len(difference)))
+
+
+def _merge_states(capital, prob):
+    """合并资金相同的状态，概率相加；去掉概率为 0 的状态。"""
+    capital = np.concatenate(capital)
+    prob = np.concatenate(prob)
+    keep = prob > 0
+    capital, prob = capital[keep], prob[keep]
+    if len(capital) == 0:
+        return capital, prob
+    # 按分排序（稳定排序，每组保留最先出现的资金），相邻相同的为一组，概率按组相加
+    keys = np.round(capital, CAPITAL_DECIMALS)
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    return capital[order[starts]], np.add.reduceat(prob[order], starts)
+
+
+def _martingale_day_exact(capital, prob, odds, win_prob, bets_per_day, daily_target, limit):
+    """一天的马丁策略资金分布；当天已结束的状态超过 limit 种时返回 None。"""
+    done_capital, done_prob = [], []
+    day_loss = np.zeros(len(capital))
+    for _ in range(bets_per_day):
+        stake = _martingale_stake(capital, day_loss, odds, daily_target)
+        after = capital - stake
+        # 中奖当天结束；未中奖且资金耗尽也结束当天
+        done_capital.append(after + stake * odds)
+        done_prob.append(prob * win_prob)
+        capital, prob, day_loss = after, prob * (1 - win_prob), day_loss + stake
+        broke = capital <= 0
+        done_capital.append(capital[broke])
+        done_prob.append(prob[broke])
+        capital, prob, day_loss = capital[~broke], prob[~broke], day_loss[~broke]
+        # 合并前的状态数超过上限时才合并一次，确认合并后是否仍超过上限
+        if sum(len(part) for part in done_capital) > limit:
+            merged_capital, merged_prob = _merge_states(done_capital, done_prob)
+            if len(merged_capital) > limit:
+                return None
+            done_capital, done_prob = [merged_capital], [merged_prob]
+    return _merge_states(done_capital + [capital], done_prob + [prob])
+
+
+def _independent_bets_exact(capital, prob, odds, win_prob, bets_per_day, stake_of, limit):
+    """一天的独立投注资金分布；逐注合并，超过 limit 种时返回 None。"""
+    for _ in range(bets_per_day):
+        stake = np.minimum(stake_of(capital, None), capital)
+        after = capital - stake
+        capital, prob = _merge_states([after + stake * odds, after], [prob * win_prob, prob * (1 - win_prob)])
+        if len(capital) > limit:
+            return None
+    return capital, prob
+
+
+def exact_outcome(capital, odds, win_prob, days, bets_per_day, strategy, total_target, daily_target=None,
+                  flat_stake=None, bet_percent=None):
+    """逐天传播资金分布，精确计算各项概率（与模拟规则相同，没有抽样误差，耗时与模拟次数无关）。
+
+    返回字典：achieved_target 达到目标盈利概率、bankrupt 破产概率、profit_positive 最终盈利为正的概率、
+    expected_profit 平均最终盈亏，distribution 为 最终盈亏 → 概率 表。
+    资金状态数超过 MAX_STATES 时返回 None。
+    """
+    martingale = "马丁" in strategy
+    stake_of = None if martingale else _stake_rule(strategy, odds, win_prob, flat_stake, bet_percent)
+    current, prob = np.array([float(capital)]), np.array([1.0])
+    finished_capital, finished_prob = [], []
+    achieved = 0.0
+
+    for _ in range(int(days)):
+        if len(current) == 0:
+            break
+        # 每注之后就检查状态数，超过上限立即放弃，不必先算完当天
+        limit = MAX_STATES - sum(len(part) for part in finished_capital)
+        if martingale:
+            day = _martingale_day_exact(current, prob, odds, win_prob, int(bets_per_day), daily_target, limit)
+        elif stake_of is not None:
+            day = _independent_bets_exact(current, prob, odds, win_prob, int(bets_per_day), stake_of, limit)
+        else:
+            day = current, prob
+        if day is None:
+            return None
+        current, prob = day
+        stopped = current <= 0
+        reached = current - capital >= total_target
+        if martingale:
+            reached &= ~stopped
+        achieved += prob[reached].sum()
+        finished = stopped | reached
+        finished_capital.append(current[finished])
+        finished_prob.append(prob[finished])
+        current, prob = current[~finished], prob[~finished]
+        if len(current) + sum(len(part) for part in finished_capital) > MAX_STATES:
+            return None
+
+    final, final_prob = _merge_states(finished_capital + [current], finished_prob + [prob])
+    profit = final - capital
+    return {
+        "achieved_target": achieved,
+        "bankrupt": final_prob[final <= BANKRUPT_THRESHOLD].sum(),
+        "profit_positive": final_prob[profit > 0].sum(),
+        "expected_profit": float(np.dot(profit, final_prob)),
+        "distribution": pd.DataFrame({"最终盈亏": profit, "概率": final_prob}),
+    }
@@ -0,0 +1,394 @@
+"""总进球玩法（斐波那契 / 倍投，不开倒车）盈亏分布的精确计算。
+
+一条下注路径的盈亏只取决于各段连败的长度：每次中奖前的连败长度决定这次中奖时的注额，
+末尾没有等到中奖的连败只贡献亏损。因此按"连败长度"做动态规划，统计每种
+(中奖注额合计, 未中奖注额合计) 出现的路径数，即可得到与逐条枚举组合完全一致的结果，
+而不需要遍历 C(天数, 未中奖天数) 条路径。
+
+连败结构分布与赔率、起投金额无关：总盈亏 = 起投金额 × ((赔率 - 1) × 中奖注额 - 未中奖注额)，
+投注总金额也只按起投金额缩放。结构算好一次后，换赔率/起投金额只需在各结构上做一次列运算。
+
+不同连败结构的数量随天数和未中奖天数增长很快，超过 MAX_STRUCTURES 种时不做精确计算。
+按该上限实测（斐波那契、倍投 2~3 倍，含末尾连败天数）：天数不超过 64 时全部未中奖天数都可计算；
+天数更多时，未中奖天数约在 50 到 天数 - 6 之间的组合超过上限（如 100 天时斐波那契为 52~94、
+倍投 3 倍为 50~94），未中奖天数更少或接近天数的照常计算，单次约几秒以内。
+一次计算全部未中奖天数（streak_surface）时，各未中奖天数的结构合计也不能超过该上限，
+约为斐波那契 52 天、倍投 2 倍 51 天、倍投 3 倍 49 天以内。
+"""
+from math import comb
+
+import numpy as np
+import pandas as pd
+
+FIBONACCI = "斐波那契"
+MARTINGALE = "倍投"
+
+# 超过该值的注额/路径数改用 Python 整数（object 数组）保存，避免 int64 溢出
+INT64_LIMIT = 2 ** 62
+
+# 动态规划中允许的最多连败结构数（每步合并后各状态的行数合计），超过时不做精确计算，避免耗时过长和内存耗尽
+MAX_STRUCTURES = 1000000
+# 合并前的临时行数最多为 MAX_STRUCTURES 的这么多倍（通常只比合并后多 30%~50%）
+MERGE_HEADROOM = 5
+
+
+class StructureLimitError(ValueError):
+    """连败结构数超过 MAX_STRUCTURES。"""
+
+
+def bet_ladder(strategy, multiplier, max_streak):
+    """返回连败 0..max_streak 次后下一注的金额（以起投金额为 1 个单位）。"""
+    if strategy == MARTINGALE:
+        return [multiplier ** s for s in range(max_streak + 1)]
+    # 斐波那契：100 → 200 → 300 → 500 → 800 ...
+    ladder = [1, 2]
+    while len(ladder) < max_streak + 1:
+        ladder.append(ladder[-1] + ladder[-2])
+    return ladder[:max_streak + 1]
+
+
+def _merge(parts):
+    """合并若干组 (键列..., 路径数) 数组，相同键的路径数相加。"""
+    columns = [np.concatenate(column) for column in zip(*parts)]
+    if len(parts) == 1:
+        return tuple(columns)
+    return _reduce(columns[:-1], columns[-1])
+
+
+def _reduce(keys, counts):
+    """按键列排序后把相同键的路径数相加。"""
+    order = np.lexsort(keys[::-1])
+    keys = [key[order] for key in keys]
+    counts = counts[order]
+    start = np.zeros(len(counts), dtype=bool)
+    start[0] = True
+    for key in keys:
+        start[1:] |= key[1:] != key[:-1]
+    index = np.flatnonzero(start)
+    return tuple(key[index] for key in keys) + (np.add.reduceat(counts, index),)
+
+
+def loss_totals(ladder):
+    """loss_total[s]：连败 s 次累计亏损的注额。"""
+    loss_total = [0]
+    for bet in ladder:
+        loss_total.append(loss_total[-1] + bet)
+    return loss_total
+
+
+def _dtypes(days, ladder, loss_total, max_paths):
+    """根据注额和路径数的上界选择数组类型。"""
+    key_dtype = np.int64 if max(days * ladder[-1], loss_total[-1]) < INT64_LIMIT else object
+    count_dtype = np.int64 if max_paths < INT64_LIMIT else object
+    return key_dtype, count_dtype
+
+
+def _streak_states(days, max_no_win_days, max_win_days, ladder, loss_total, key_dtype, count_dtype,
+                   max_rows=None):
+    """按连败长度从长到短动态规划。
+
+    返回 states[(已分配的未中奖天数, 已占用的中奖次数)] = (中奖注额, 未中奖注额, 排列数)，
+    排列数为这些连败段之间的不同排列方式（已占用次数! / ∏ 每种长度的段数!）。
+    给定 max_rows 时，某一步合并后的行数超过它即抛出 StructureLimitError；合并前的临时行数
+    超过它的 MERGE_HEADROOM 倍时提前放弃，限制单步的内存峰值。
+    """
+    def column(value, dtype):
+        return np.full(1, value, dtype=dtype)
+
+    states = {(0, 0): (column(0, key_dtype), column(0, key_dtype), column(1, count_dtype))}
+    for streak in range(max_no_win_days, 0, -1):
+        grouped = {}
+        rows = 0
+        for (used, slots), (win, loss, count) in states.items():
+            grouped.setdefault((used, slots), []).append((win, loss, count))
+            # 每段长度为 streak 的连败占用 streak 个未中奖天和其后的 1 个中奖天
+            max_times = min((max_no_win_days - used) // streak, max_win_days - slots,
+                            (days - used - slots) // (streak + 1))
+            for times in range(1, max_times + 1):
+                grouped.setdefault((used + times * streak, slots + times), []).append((
+                    win + times * ladder[streak],
+                    loss + times * loss_total[streak],
+                    count * comb(slots + times, times),
+                ))
+                rows += len(win)
+            rows += len(win)
+            if max_rows is not None and rows > max_rows * MERGE_HEADROOM:
+                raise StructureLimitError(f'连败结构超过 {max_rows} 种')
+        states = {key: _merge(parts) for key, parts in grouped.items()}
+        if max_rows is not None and sum(len(win) for win, _, _ in states.values()) > max_rows:
+            raise StructureLimitError(f'连败结构超过 {max_rows} 种')
+    return states
+
+
+def _finish_states(states, days, no_win_days, loss_total, key_dtype, with_tail):
+    """把动态规划状态补齐为恰好 no_win_days 个未中奖天的完整路径，返回合并后的各列。"""
+    win_days = days - no_win_days
+    by_tail = {}
+    for (used, slots), (win, loss, count) in states.items():
+        if used > no_win_days or slots > win_days:
+            continue
+        # 剩余的中奖天之前没有连败（按起投金额中奖），剩余的未中奖天数构成末尾连败；
+        # 连败段在 win_days 个中奖天中选 slots 个位置
+        tail = no_win_days - used
+        by_tail.setdefault(tail, []).append(
+            (win + (win_days - slots), loss + loss_total[tail], count * comb(win_days, slots)))
+    if not with_tail:
+        return _merge([part for parts in by_tail.values() for part in parts])
+    # 末尾连败天数由状态决定：同一末尾连败天数的各部分按 (中奖注额, 未中奖注额) 合并后直接拼接，
+    # 不必按三列合并
+    merged = []
+    for tail, parts in by_tail.items():
+        win, loss, count = _merge(parts)
+        merged.append((win, loss, np.full(len(count), tail, dtype=key_dtype), count))
+    return tuple(np.concatenate(column) for column in zip(*merged))
+
+
+def _structure_frame(columns, with_tail):
+    names = ['中奖注额', '未中奖注额'] + (['末尾连败天数'] if with_tail else []) + ['出现次数']
+    return pd.DataFrame(dict(zip(names, columns)))
+
+
+def streak_distribution(days, no_win_days, strategy=FIBONACCI, multiplier=2, with_tail=False):
+    """按连败长度结构统计路径数。
+
+    返回 DataFrame：中奖注额、未中奖注额（均以起投金额为单位）、出现次数；
+    with_tail=True 时另含末尾连败天数（决定最后一天之后的下一注金额）。
+    连败结构超过 MAX_STRUCTURES 种时抛出 StructureLimitError。
+    """
+    days = int(days)
+    no_win_days = int(no_win_days)
+    ladder = bet_ladder(strategy, multiplier, no_win_days)
+    loss_total = loss_totals(ladder)
+    key_dtype, count_dtype = _dtypes(days, ladder, loss_total, comb(days, no_win_days))
+
+    states = _streak_states(days, no_win_days, days - no_win_days, ladder, loss_total, key_dtype, count_dtype,
+                            MAX_STRUCTURES)
+    columns = _finish_states(states, days, no_win_days, loss_total, key_dtype, with_tail)
+    return _structure_frame(columns, with_tail)
+
+
+def float_structure(structure):
+    """注额列转为浮点数、末尾连败天数转为 int64 的结构，供按赔率推导各盈亏表。
+
+    注额、路径数超出 int64 时为 Python 整数，逐个转换和相加都很慢；这样的路径数在表格中本就按浮点数显示，
+    一并转为浮点数（int64 的路径数不变）。转换一次后各表直接复用，不必每张表各转一遍。
+    """
+    dtypes = {'中奖注额': float, '未中奖注额': float, '末尾连败天数': np.int64}
+    if structure['出现次数'].dtype == object:
+        dtypes['出现次数'] = float
+    return structure.astype({column: dtype for column, dtype in dtypes.items() if column in structure}, copy=False)
+
+
+def fold_tail(structure):
+    """去掉 with_tail=True 结果中的末尾连败天数，相同 (中奖注额, 未中奖注额) 的出现次数相加。"""
+    columns = _reduce([structure['中奖注额'].to_numpy(), structure['未中奖注额'].to_numpy()],
+                      structure['出现次数'].to_numpy())
+    return _structure_frame(columns, False)
+
+
+def streak_surface(days, strategy=FIBONACCI, multiplier=2, with_tail=False):
+    """一次动态规划得到未中奖天数 0..days 每一种情况的连败结构分布。
+
+    返回 {未中奖天数: DataFrame}，各 DataFrame 与 streak_distribution 的结果相同。
+    各未中奖天数的连败结构合计超过 MAX_STRUCTURES 种时抛出 StructureLimitError（逐个未中奖天数累计，
+    超过即放弃）。
+    """
+    days = int(days)
+    ladder = bet_ladder(strategy, multiplier, days)
+    loss_total = loss_totals(ladder)
+    key_dtype, count_dtype = _dtypes(days, ladder, loss_total, comb(days, days // 2))
+
+    states = _streak_states(days, days, days, ladder, loss_total, key_dtype, count_dtype, MAX_STRUCTURES)
+    surface = {}
+    rows = 0
+    for no_win_days in range(days + 1):
+        structure = _structure_frame(_finish_states(states, days, no_win_days, loss_total, key_dtype, with_tail),
+                                     with_tail)
+        rows += len(structure)
+        if rows > MAX_STRUCTURES:
+            raise StructureLimitError(f'全部未中奖天数的连败结构超过 {MAX_STRUCTURES} 种')
+        surface[no_win_days] = structure
+    return surface
+
+
+def _display_counts(counts):
+    """超出 int64 的路径数（Python 整数）转为浮点数，页面表格才能显示。"""
+    return counts.astype(float) if counts.dtype == object else counts
+
+
+def _percent(counts, total):
+    # 先转为浮点数再相除：Python 大整数逐个精确相除很慢，差别只在浮点末位
+    return np.asarray(counts, dtype=float) / float(total) * 100
+
+
+def _rounded(values):
+    # 按分取整；加 0.0 把 -0.0 变为 0.0
+    return np.round(np.asarray(values, dtype=float), 2) + 0.0
+
+
+def _group_counts(columns, counts):
+    """按若干列分组相加路径数：一次 lexsort 后相邻相同的为一组（路径数可以是 Python 整数）。
+
+    返回 (各列的分组值, 各组路径数)，按各列升序，与 groupby(...).sum() 的结果一致。
+    """
+    counts = np.asarray(counts)
+    if len(counts) == 0:
+        return [column[:0] for column in columns], counts[:0]
+    # 单列时直接 argsort（比 lexsort 快），相同值本就归为一组，顺序不影响结果
+    order = columns[0].argsort() if len(columns) == 1 else np.lexsort(columns[::-1])
+    columns = [column[order] for column in columns]
+    starts = np.zeros(len(order), dtype=bool)
+    starts[0] = True
+    for column in columns:
+        starts[1:] |= column[1:] != column[:-1]
+    starts = np.flatnonzero(starts)
+    return [column[starts] for column in columns], np.add.reduceat(counts[order], starts)
+
+
+def value_counts_table(values, counts, column, percent_column='百分比'):
+    """把 (数值, 路径数) 汇总成 数值 → 出现次数/百分比 表，按出现次数降序。"""
+    (values,), grouped = _group_counts([_rounded(values)], counts)
+    table = pd.DataFrame({column: values, '出现次数': _display_counts(grouped)})
+    table[percent_column] = _percent(grouped, grouped.sum())
+    # 按浮点百分比排序，避免对 Python 大整数列排序
+    order = np.argsort(-table[percent_column].to_numpy(), kind='stable')
+    return table.iloc[order].reset_index(drop=True)
+
+
+def player_profit(structure, odds, initial_bet):
+    """每种结构对应的彩民总盈亏。"""
+    win = structure['中奖注额'].to_numpy(dtype=float)
+    loss = structure['未中奖注额'].to_numpy(dtype=float)
+    return initial_bet * ((odds - 1) * win - loss)
+
+
+def profit_distribution(odds, days, no_win_days, initial_bet=100, strategy=FIBONACCI, multiplier=2,
+                        percent_column='百分比', structure=None):
+    """计算 总盈亏 → 出现次数/百分比 表，结果与逐条枚举所有未中奖天数组合一致。
+
+    structure 为已算好的 streak_distribution 结果（与赔率、起投金额无关，可复用）。
+    """
+    if structure is None:
+        structure = streak_distribution(days, no_win_days, strategy, multiplier)
+    return value_counts_table(player_profit(structure, odds, initial_bet), structure['出现次数'].to_numpy(),
+                              '总盈亏', percent_column)
+
+
+def total_bet_amount(structure, initial_bet, strategy=FIBONACCI, multiplier=2):
+    """每种结构对应的投注总金额（与原页面口径一致：每天结算后累加的是下一注金额）。"""
+    win = structure['中奖注额'].to_numpy(dtype=float)
+    loss = structure['未中奖注额'].to_numpy(dtype=float)
+    tail = structure['末尾连败天数'].to_numpy(dtype=np.int64)
+    next_bet = np.array(bet_ladder(strategy, multiplier, int(tail.max())), dtype=float)[tail]
+    # 累加的是第 2 天到第 days+1 天的注额 = 全部实际注额 - 首注 + 最后一天之后的下一注
+    return initial_bet * (win + loss - 1 + next_bet)
+
+
+def owner_income(structure, odds, initial_bet, commission_rate, actual_odds, strategy=FIBONACCI, multiplier=2):
+    """每种结构对应的店主提成收入和赔率差收入（赔率差按彩民每次中奖的盈利计算）。"""
+    commission_income = total_bet_amount(structure, initial_bet, strategy, multiplier) * commission_rate
+    win = structure['中奖注额'].to_numpy(dtype=float)
+    # 各中奖日盈利之和 = 中奖注额 × (赔率 - 1)，赔率为 1 时盈利为 0，不计赔率差
+    odds_difference_income = initial_bet * win * (odds - 1) * (actual_odds - odds)
+    return commission_income, odds_difference_income
+
+
+def joint_tables(odds, days, no_win_days, initial_bet, commission_rate, actual_odds, strategy=FIBONACCI,
+                 multiplier=2, percent_column='概率', structure=None):
+    """彩民总盈亏、店主总收入、投注总金额的联合分布，以及店主总收入的分布和合计。
+
+    structure 为已算好的 streak_distribution(with_tail=True) 结果（或其 float_structure）。
+    """
+    if structure is None:
+        structure = streak_distribution(days, no_win_days, strategy, multiplier, with_tail=True)
+    structure = float_structure(structure)
+    counts = structure['出现次数'].to_numpy()
+    profits = player_profit(structure, odds, initial_bet)
+    bets = total_bet_amount(structure, initial_bet, strategy, multiplier)
+    commission_income, odds_difference_income = owner_income(structure, odds, initial_bet, commission_rate,
+                                                              actual_odds, strategy, multiplier)
+    owner_total = commission_income + odds_difference_income
+
+    (profit_values, owner_values, bet_values), grouped = _group_counts(
+        [_rounded(profits), _rounded(owner_total), _rounded(bets)], counts)
+    joint = pd.DataFrame({'彩民总盈亏': profit_values, '店主总收入': owner_values, '投注总金额': bet_values,
+                          '出现次数': grouped})
+    joint[percent_column] = _percent(grouped, comb(int(days), int(no_win_days)))
+    joint['出现次数'] = _display_counts(grouped)
+    order = np.argsort(-joint[percent_column].to_numpy(), kind='stable')
+    float_counts = counts.astype(float)
+    return {
+        '联合分布': joint.iloc[order].reset_index(drop=True),
+        '店主总收入': value_counts_table(owner_total, counts, '店主总收入', percent_column),
+        '店主提成收入合计': float(np.dot(commission_income, float_counts)),
+        '店主赔率差收入合计': float(np.dot(odds_difference_income, float_counts)),
+    }
+
+
+def player_tables(odds, days, no_win_days, initial_bet=100, strategy=FIBONACCI, multiplier=2, percent_column='概率',
+                  structure=None):
+    """彩民侧的 总盈亏 / 投注总金额 / 总奖金 分布表，以及全部路径的总盈亏合计。
+
+    structure 为已算好的 streak_distribution(with_tail=True) 结果（或其 float_structure）。
+    """
+    if structure is None:
+        structure = streak_distribution(days, no_win_days, strategy, multiplier, with_tail=True)
+    structure = float_structure(structure)
+    counts = structure['出现次数'].to_numpy()
+    profits = player_profit(structure, odds, initial_bet)
+    bets = total_bet_amount(structure, initial_bet, strategy, multiplier)
+    return {
+        '总盈亏': value_counts_table(profits, counts, '总盈亏', percent_column),
+        '投注总金额': value_counts_table(bets, counts, '投注总金额', percent_column),
+        '总奖金': value_counts_table(profits + bets, counts, '总奖金', percent_column),
+        '总盈亏合计': float(np.dot(profits, counts.astype(float))),
+    }
+
+
+def binomial_probability(days, no_win_days, win_prob):
+    """每日中奖概率为 win_prob 时，恰好 no_win_days 天未中奖的概率。"""
+    return comb(days, no_win_days) * (1 - win_prob) ** no_win_days * win_prob ** (days - no_win_days)
+
+
+def profit_surface(odds, days, initial_bet=100, strategy=FIBONACCI, multiplier=2, surface=None):
+    """一次计算未中奖天数 0..days 全部情况的总盈亏分布。
+
+    返回列：未中奖天数、总盈亏、出现次数、百分比（在该未中奖天数内的占比）。
+    surface 为已算好的 streak_surface 结果。
+    """
+    if surface is None:
+        surface = streak_surface(days, strategy, multiplier)
+    tables = []
+    for no_win_days, structure in surface.items():
+        table = value_counts_table(player_profit(structure, odds, initial_bet), structure['出现次数'].to_numpy(),
+                                   '总盈亏')
+        table.insert(0, '未中奖天数', no_win_days)
+        tables.append(table)
+    return pd.concat(tables, ignore_index=True)
+
+
+def weight_surface(surface, days, win_prob):
+    """给 profit_surface 的结果加上 加权概率 列（每日中奖概率为 win_prob 时按二项分布加权后占全部情况的百分比），
+    返回新表，不修改 surface。"""
+    weights = {no_win_days: binomial_probability(days, no_win_days, win_prob) for no_win_days in range(days + 1)}
+    return surface.assign(加权概率=surface['百分比'] * surface['未中奖天数'].map(weights))
+
+
+def surface_summary(surface):
+    """按未中奖天数汇总 profit_surface 的结果：路径数、盈利概率、平均/最差/最好盈亏。"""
+    profit = surface['总盈亏']
+    share = surface['百分比']
+    grouped = surface.assign(
+        盈利占比=share.where(profit > 0, 0.0),
+        加权盈亏=profit * share / 100,
+    ).groupby('未中奖天数')
+    summary = pd.DataFrame({
+        '路径数': grouped['出现次数'].sum(),
+        '盈利概率': grouped['盈利占比'].sum(),
+        '平均盈亏': grouped['加权盈亏'].sum(),
+        '最差盈亏': grouped['总盈亏'].min(),
+        '最好盈亏': grouped['总盈亏'].max(),
+    })
+    if '加权概率' in surface:
+        summary['出现概率'] = grouped['加权概率'].sum()
+    return summary.reset_index()
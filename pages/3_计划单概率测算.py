@@ -1,8 +1,11 @@
 import streamlit as st
 import pandas as pd
+import os
 import numpy as np
 import altair as alt
 
+from lottery import cache, charts, history, recommend, risk, simulation
+
 # 设置页面配置
 st.set_page_config(page_title="足彩投注策略优化工具", layout="wide")
 
@@ -31,7 +34,7 @@ else:
     win_prob = st.sidebar.slider("预期胜率 (每次投注中奖概率)", min_value=0.0, max_value=1.0, value=min(1.0, 1.0/avg_odds + 0.1), step=0.01)
 
 strategy = st.sidebar.selectbox("选择投注策略", 
-    options=["固定投注 (定额投注)", "马丁格尔策略 (翻倍投注)", "凯利策略 (凯利公式投注)", "比例投注 (每次投入固定比例资金)"], 
+    options=simulation.STRATEGIES, 
     index=1)  # 默认选择马丁格尔
 
 # 如果策略是马丁格尔，显示每日目标盈利输入；否则不需要每日目标
@@ -63,41 +66,33 @@ uploaded_file = st.file_uploader("上传历史数据文件", type=["csv", "xlsx"
 
 # 检查用户是否上传了文件
 if uploaded_file:
-    # 根据文件扩展名选择读取方法
+    # 按块解析并转换为紧凑的列类型，解析结果按文件内容的哈希缓存，重复上传或页面刷新时直接复用；
+    # 哈希每次运行只算一次，下面的重抽样和推荐也用它作为缓存键
     file_name = uploaded_file.name
+    file_bytes = uploaded_file.getvalue()
+    digest = history.content_hash(file_bytes)
     try:
-        if file_name.endswith(".csv"):
-            data = pd.read_csv(uploaded_file)
-        else:
-            data = pd.read_excel(uploaded_file)
+        data = cache.load_history(digest, file_name, file_bytes)
     except Exception as e:
         st.error(f"读取数据文件失败: {e}")
         data = None
 
     if data is not None:
         st.subheader("历史数据概览")
-        # 在显示数据前进行类型转换
-        display_data = data.copy()
+        st.caption(f"共 {len(data)} 行，占用内存 {data.memory_usage(deep=True).sum() / 1024 ** 2:.1f} MB")
+        # 只复制要显示的前10行做类型转换
+        display_data = data.head(10).copy()
         for col in display_data.columns:
-            if col.lower() in ["odds", "赔率"]:
+            if str(col).lower() in history.ODDS_NAMES:
                 display_data[col] = display_data[col].astype(str)
-        st.write(display_data.head(10))  # 显示前10行数据
-
-        # 检测常见字段名
-        odds_col = None
-        profit_col = None
-        outcome_col = None
-        stake_col = None
-        # 常见字段中文/英文名称
-        for col in data.columns:
-            if col.lower() in ["odds", "赔率"]:
-                odds_col = col
-            if col.lower() in ["profit", "盈亏", "收益"]:
-                profit_col = col
-            if col.lower() in ["result", "outcome", "中奖", "是否中奖"]:
-                outcome_col = col
-            if col.lower() in ["stake", "投注", "投注额", "金额"]:
-                stake_col = col
+        st.write(display_data)
+
+        # 检测常见字段名（中文/英文）；中奖结果列已转换为 0/1
+        columns = history.detect_columns(data.columns)
+        odds_col = columns["odds"]
+        profit_col = columns["profit"]
+        outcome_col = columns["outcome"]
+        stake_col = columns["stake"]
 
         # 如果没有盈利列但有结果和投注额和赔率，则计算每笔盈利
         if profit_col is None:
@@ -114,14 +109,15 @@ if uploaded_file:
         if odds_col:
             st.subheader("赔率分布")
             try:
-                odds_values = data[odds_col].astype(float)
-                # 创建用于显示的DataFrame并确保类型转换
-                chart_data = pd.DataFrame({"odds": odds_values})
-                chart_data["odds"] = chart_data["odds"].astype(str)
+                # 先在本地分箱，只把各区间的频数交给图表（历史数据可达百万行）
+                odds_values = data[odds_col].astype(float).dropna()
+                odds_counts, odds_edges = np.histogram(odds_values, bins=20)
+                chart_data = pd.DataFrame({"start": odds_edges[:-1], "end": odds_edges[1:], "count": odds_counts})
                 # 绘制赔率直方图
                 chart = alt.Chart(chart_data).mark_bar().encode(
-                    alt.X("odds:Q", bin=alt.Bin(maxbins=20), title="赔率区间"),
-                    alt.Y('count()', title='频数')
+                    alt.X("start", bin="binned", title="赔率区间"),
+                    alt.X2("end"),
+                    alt.Y("count", title='频数')
                 )
                 st.altair_chart(chart, use_container_width=True)
             except Exception as e:
@@ -129,23 +125,25 @@ if uploaded_file:
         else:
             st.write("未找到赔率列，无法进行赔率分布分析。")
 
-        # 盈利曲线展示
+        # 如果有日期或时间列，按照时间排序后再计算累计盈亏、回撤和连败
+        date_col = columns["date"]
+        if date_col:
+            data = data.sort_values(by=date_col, kind="stable")
+
+        # 盈利曲线展示：累计盈亏与回撤一次算出
         if profit_col:
             st.subheader("累计盈利曲线")
-            # 如果有日期或时间列，尝试按照时间排序
-            if 'date' in data.columns.str.lower() or '日期' in data.columns:
-                # 找到日期列名
-                date_col = None
-                for col in data.columns:
-                    if "date" in col.lower() or "日期" in col:
-                        date_col = col
-                        break
-                if date_col:
-                    data = data.sort_values(by=date_col)
-            # 计算累计盈亏
-            data['累计盈亏'] = data[profit_col].cumsum()
+            cum_profit, drawdown, max_drawdown_amount = risk.drawdown_curve(data[profit_col])
+            # 长序列降采样到固定点数再绘图，最大回撤的起点（此前最高点）和谷底保持精确
+            max_points = st.number_input("曲线最多显示点数", min_value=100, max_value=50000, value=charts.MAX_POINTS,
+                                         step=500)
+            trough = int(drawdown.argmin()) if len(drawdown) else 0
+            peak = int(cum_profit[:trough + 1].argmax()) if len(cum_profit) else 0
+            shown = charts.downsample(cum_profit, max_points, keep=(peak, trough))
+            if len(shown) < len(cum_profit):
+                st.caption(f"共 {len(cum_profit)} 笔投注，曲线按形状降采样为 {len(shown)} 个点。")
             # 绘制累计盈亏曲线
-            line_chart = alt.Chart(data.reset_index()).mark_line().encode(
+            line_chart = alt.Chart(pd.DataFrame({"index": shown, "累计盈亏": cum_profit[shown]})).mark_line().encode(
                 x=alt.X('index', title='投注次数'),
                 y=alt.Y('累计盈亏', title='累计盈亏')
             )
@@ -156,42 +154,37 @@ if uploaded_file:
         # 回撤分析与风险控制
         if profit_col:
             st.subheader("最大回撤分析")
-            cum_profit = data[profit_col].cumsum()
-            running_max = cum_profit.cummax()
-            drawdown = cum_profit - running_max
-            max_drawdown = drawdown.min()
-            max_drawdown_amount = abs(max_drawdown) if max_drawdown < 0 else 0.0
             st.write(f"历史最大回撤: {-max_drawdown_amount:.2f}")  # 负值取绝对值显示
             # 绘制回撤曲线（用负值表示回撤幅度）
-            drawdown_chart = alt.Chart(pd.DataFrame({"drawdown": drawdown})).mark_area(color='orange').encode(
+            shown = charts.downsample(drawdown, max_points, keep=(peak, trough))
+            drawdown_chart = alt.Chart(pd.DataFrame({"index": shown, "drawdown": drawdown[shown]})).mark_area(color='orange').encode(
                 x=alt.X('index', title='投注次数'),
                 y=alt.Y('drawdown', title='回撤金额')
             )
             st.altair_chart(drawdown_chart, use_container_width=True)
-        # 计算最长连败（风险指标）
+        # 计算最长连败（风险指标）：如果有 outcome 列直接用；否则用 profit 列判断正负
         if outcome_col or profit_col:
-            # 构造胜负序列：如果有 outcome 列直接用；否则用 profit 列判断正负
-            if outcome_col:
-                wins_losses = data[outcome_col].apply(lambda x: 1 if x in [1, '1', 'win', 'Win', 'WIN', '中奖'] else 0)
-            elif profit_col:
-                wins_losses = data[profit_col].apply(lambda x: 1 if x > 0 else 0)
-            else:
-                wins_losses = None
-            if wins_losses is not None:
-                losses = (wins_losses == 0).astype(int)
-                # 计算最长连续1的长度，这里计算最长连续的0（连败）
-                max_losing_streak = 0
-                current_streak = 0
-                for val in losses:
-                    if val == 1:  # 这是一次失败
-                        current_streak += 1
-                        max_losing_streak = max(max_losing_streak, current_streak)
-                    else:
-                        current_streak = 0
-                st.write(f"历史最长连续未中奖次数: {max_losing_streak}")
-                if "马丁" in strategy and daily_target is not None:
-                    if bets_per_day < max_losing_streak:
-                        st.warning(f"注意：历史最大连败为{max_losing_streak}，已超过当前设置的马丁策略最大连投次数{bets_per_day}，可能存在较高风险！")
+            wins = risk.win_flags(data, outcome_col, profit_col)
+            max_losing_streak, streak_counts = risk.losing_streaks(wins)
+            st.write(f"历史最长连续未中奖次数: {max_losing_streak}")
+            if "马丁" in strategy and daily_target is not None:
+                if bets_per_day < max_losing_streak:
+                    st.warning(f"注意：历史最大连败为{max_losing_streak}，已超过当前设置的马丁策略最大连投次数{bets_per_day}，可能存在较高风险！")
+            if len(streak_counts):
+                with st.expander("连败长度分布"):
+                    st.dataframe(streak_counts)
+
+        # 分组统计：按日期、赔率区间、组别汇总投注次数、中奖率和盈亏（一次 groupby）
+        if profit_col:
+            tables = risk.breakdown(data, profit_col, wins, odds_col, date_col, columns["group"], stake_col)
+            if tables:
+                st.subheader("分组统计")
+                tabs = st.tabs([f"按{name}" for name in tables])
+                for tab, (name, table) in zip(tabs, tables.items()):
+                    formats = {"中奖率": "{:.2%}", "盈亏": "{:.2f}"}
+                    if "回报率" in table.columns:
+                        formats.update({"回报率": "{:.2%}", "投注额": "{:.2f}"})
+                    tab.dataframe(table.astype({name: str}).style.format(formats))
     else:
         st.error("数据加载失败，无法进行可视化分析。")
 else:
@@ -218,168 +211,281 @@ odds = avg_odds
 p = win_prob  # 胜率
 strategy_name = strategy
 
-# 设置模拟次数
-sim_runs = st.number_input("模拟次数(随机试验数量)", min_value=100, max_value=10000, value=1000, step=100)
-
-# 定义策略模拟函数
-def simulate_strategy(capital, odds, win_prob, days, bets_per_day, strategy, daily_target=None, flat_stake=None, bet_percent=None):
-    """模拟给定策略一次完整运行，返回最终资金以及是否达到目标盈利。"""
-    initial_cap = capital
-    current_cap = capital
-    achieved_target = False
-    # 循环天数
-    for day in range(1, days+1):
-        # 每天根据策略执行投注
-        if "马丁" in strategy:
-            # 马丁格尔策略：每天以daily_target为目标进行最多bets_per_day次投注
-            day_loss = 0.0
-            success = False
-            for attempt in range(1, bets_per_day+1):
-                # 计算本次投注额
-                # 如资金不足以按照公式投注，则投入剩余全部资金（相当于破产前最后一搏）
-                required_stake = (day_loss + daily_target) / (odds - 1) if odds > 1 else current_cap
-                stake = required_stake if current_cap >= required_stake else current_cap
-                # 扣除投注额
-                current_cap -= stake
-                # 随机结果
-                if np.random.rand() < win_prob:
-                    # 中奖，获得赔付
-                    payout = stake * odds  # 含本金的返奖总额
-                    profit = payout - stake  # 净利润
-                    current_cap += payout  # 本金返还加利润计入资金
-                    success = True
-                    break  # 当天达到目标盈利，退出循环
-                else:
-                    # 未中奖，累计损失
-                    day_loss += stake
-                    # 若资金已耗尽，则提前结束模拟
-                    if current_cap <= 0:
-                        break
-            # 如果当天结束仍未成功且资金用完，则提前结束整个模拟
-            if current_cap <= 0:
-                break
-            # （马丁策略下，无论当天成功与否，都继续到下一天；但如果资金不足则已跳出）
-        elif "固定投注" in strategy and "定额" in strategy:
-            # 固定金额投注，每天 bets_per_day 次独立投注
-            for b in range(bets_per_day):
-                if current_cap <= 0:
-                    break
-                stake = flat_stake if flat_stake is not None else 0
-                if current_cap < stake:
-                    # 如果资金不足以投注既定金额，则投注剩余资金
-                    stake = current_cap
-                current_cap -= stake
-                if np.random.rand() < win_prob:
-                    payout = stake * odds
-                    profit = payout - stake
-                    current_cap += payout
-                # 固定投注策略不要求单日赢止损，可以一直投满bets_per_day次
-                # （真实场景可根据需要在这儿加入赢到目标即停等规则）
-                # 这里假设固定投注不按日目标止盈，只按总目标
-        elif "凯利" in strategy:
-            # 凯利策略：每次根据凯利公式投注一定比例资金
-            for b in range(bets_per_day):
-                if current_cap <= 0:
-                    break
-                # 计算凯利投注比例
-                b_ = odds - 1  # 赔率净值
-                # 如果没有优势(win_prob <= 1/odds)，凯利系数会<=0，按不投注处理
-                kelly_fraction = (win_prob * (odds) - 1) / (odds - 1)
-                if kelly_fraction <= 0:
-                    # 无正期望，不投注（跳过本次）
-                    continue
-                # 实际投注额
-                stake = current_cap * kelly_fraction
-                if stake <= 0:
-                    continue
-                if current_cap < stake:
-                    stake = current_cap
-                current_cap -= stake
-                if np.random.rand() < win_prob:
-                    payout = stake * odds
-                    profit = payout - stake
-                    current_cap += payout
-                # 凯利策略也不按日止盈，持续投注
-        elif "比例投注" in strategy:
-            # 比例投注：每次投注一定比例资金（如每次押注当前资金的X%）
-            for b in range(bets_per_day):
-                if current_cap <= 0:
-                    break
-                if bet_percent is None or bet_percent <= 0:
-                    break
-                stake = current_cap * bet_percent
-                if stake < 0:
-                    continue
-                if current_cap < stake:
-                    stake = current_cap
-                current_cap -= stake
-                if np.random.rand() < win_prob:
-                    payout = stake * odds
-                    profit = payout - stake
-                    current_cap += payout
-        else:
-            # 默认：如果未匹配任何策略，就当作固定投注处理
-            for b in range(bets_per_day):
-                if current_cap <= 0:
-                    break
-                stake = flat_stake if flat_stake is not None else (0.05 * current_cap)
-                if current_cap < stake:
-                    stake = current_cap
-                current_cap -= stake
-                if np.random.rand() < win_prob:
-                    payout = stake * odds
-                    current_cap += payout
-        # 检查是否达到总目标盈利，如果达到则视为成功并停止模拟
-        if current_cap - initial_cap >= total_target:
-            achieved_target = True
-            break
-    final_profit = current_cap - initial_cap
-    return current_cap, final_profit, achieved_target
-
-# 运行模拟多次
-results = {
-    "final_profit": [],
-    "achieved_target": [],
-    "bankrupt": []
-}
-bankrupt_count = 0
-success_count = 0
-
-for i in range(int(sim_runs)):
-    final_cap, final_profit, achieved = simulate_strategy(cap, odds, p, num_days, bets_each_day, strategy_name, daily_target, flat_stake, bet_percentage)
-    results["final_profit"].append(final_profit)
-    results["achieved_target"].append(achieved)
-    # 认为资金<=0即为破产
-    if final_cap <= 0.0001:  # 用一个很小的阈值判断浮点
-        results["bankrupt"].append(1)
-        bankrupt_count += 1
+# 设置模拟次数、随机种子和并行进程数
+sim_runs = st.number_input("模拟次数(随机试验数量)", min_value=100, max_value=2000000, value=1000, step=100)
+sim_seed = st.number_input("随机种子(相同种子和参数得到完全相同的结果)", min_value=0, value=42, step=1)
+adaptive = st.checkbox("自适应模拟：分批模拟，各项概率的置信区间足够窄时自动停止（不使用以上模拟次数）", value=False)
+if adaptive:
+    tolerance = st.number_input("置信区间半宽上限（百分点）", min_value=0.01, max_value=10.0, value=0.5, step=0.05) / 100
+    adaptive_max_runs = st.number_input("自适应模拟次数上限", min_value=simulation.ADAPTIVE_BATCH_RUNS,
+                                        max_value=20000000, value=simulation.ADAPTIVE_MAX_RUNS,
+                                        step=simulation.ADAPTIVE_BATCH_RUNS)
+    # 概率接近 50% 时方差最大，所需次数最多；上限低于它时可能还没收敛就停止
+    needed_runs = simulation.runs_for_tolerance(tolerance)
+    if adaptive_max_runs < needed_runs:
+        st.warning(f"概率接近 50% 时约需 {needed_runs} 次模拟才能达到该精度，当前上限可能不够。")
     else:
-        results["bankrupt"].append(0)
-    if achieved:
-        success_count += 1
-
-# 计算概率
-success_rate = success_count / sim_runs
-bankrupt_rate = bankrupt_count / sim_runs
-profit_positive_rate = sum(1 for x in results["final_profit"] if x > 0) / sim_runs
+        st.caption(f"最坏情况（概率接近 50%）约需 {needed_runs} 次模拟达到该精度。")
+else:
+    cpu_count = os.cpu_count() or 1
+    sim_workers = st.number_input("并行进程数", min_value=1, max_value=cpu_count, value=cpu_count, step=1)
+
+
+def histogram_chart(hist_counts, hist_edges):
+    hist_data = pd.DataFrame({"start": hist_edges[:-1], "end": hist_edges[1:], "count": hist_counts})
+    return alt.Chart(hist_data).mark_bar().encode(
+        alt.X("start", bin="binned", title="最终盈亏区间"),
+        alt.X2("end"),
+        alt.Y("count", title='频数')
+    )
+
+
+def profit_histogram(final_profit):
+    """最终盈亏直方图：先在本地分箱，只把各区间的频数交给图表（模拟次数可达百万级）。"""
+    return histogram_chart(*np.histogram(final_profit, bins=20))
+
+
+def add_to_histogram(histogram, values, bins=20):
+    """逐批累计直方图的频数：区间宽度由第一批确定（约 bins 个区间），之后的批次超出已有范围时向两侧扩展区间。"""
+    if histogram is None:
+        low, high = float(values.min()), float(values.max())
+        histogram = {"origin": low, "width": (high - low) / bins if high > low else 1.0, "first": 0,
+                     "counts": np.zeros(0, dtype=np.int64)}
+    index = np.floor((values - histogram["origin"]) / histogram["width"]).astype(np.int64)
+    first = min(histogram["first"], int(index.min()))
+    offset = histogram["first"] - first
+    counts = np.bincount(index - first, minlength=offset + len(histogram["counts"]))
+    counts[offset:offset + len(histogram["counts"])] += histogram["counts"]
+    histogram.update(first=first, counts=counts)
+    return histogram
+
+
+def accumulated_histogram(histogram):
+    edges = histogram["origin"] + (histogram["first"] + np.arange(len(histogram["counts"]) + 1)) * histogram["width"]
+    return histogram_chart(histogram["counts"], edges)
+
+
+def rate_text(rate):
+    estimate, low, high = rate
+    return f"**{estimate*100:.2f}%**（95% 置信区间 {low*100:.2f}% ~ {high*100:.2f}%）"
+
+
+if adaptive:
+    # 逐批模拟，边算边显示当前估计和已模拟全部运行的盈亏分布（逐批累计频数），置信区间足够窄或达到上限时停止；
+    # 各批结果最后拼接一次
+    progress = st.empty()
+    batches = []
+    runs_done = 0
+    histogram = None
+    for batch, rates, done in simulation.simulate_adaptive(
+            cap, odds, p, num_days, bets_each_day, strategy_name, total_target, daily_target, flat_stake,
+            bet_percentage, tolerance, adaptive_max_runs, int(sim_seed)):
+        batches.append(batch)
+        runs_done += len(batch["final_profit"])
+        histogram = add_to_histogram(histogram, batch["final_profit"])
+        with progress.container():
+            st.write(f"已模拟 {runs_done} 次，达到目标盈利的概率 {rate_text(rates['achieved_target'])}")
+            st.altair_chart(accumulated_histogram(histogram), use_container_width=True)
+    progress.empty()
+    results = simulation.concat_results(batches)
+    if simulation.within_tolerance(rates, tolerance):
+        st.caption(f"自适应模拟共运行 {runs_done} 次，各项概率置信区间的半宽均已不超过 {tolerance*100:.2f} 个百分点。")
+    else:
+        widest = max((high - low) / 2 for _, low, high in rates.values())
+        st.warning(f"已达到模拟次数上限 {runs_done} 次仍未收敛：置信区间半宽最大为 {widest*100:.2f} 个百分点，"
+                   f"要求不超过 {tolerance*100:.2f}。可提高上限或放宽精度要求。")
+else:
+    # 同时模拟全部次数：各次运行的资金、当日亏损等按数组逐天推进，规则与逐次模拟一次运行一致；
+    # 模拟次数较多时分块到多个进程，每块使用由种子派生的独立随机数流，结果与进程数无关，并按参数缓存
+    results = cache.simulate_parallel(sim_runs, cap, odds, p, num_days, bets_each_day, strategy_name, total_target,
+                                      daily_target, flat_stake, bet_percentage, int(sim_seed), _workers=sim_workers)
+    rates = simulation.estimate_rates(results)
 
-# 显示模拟结果
+# 显示模拟结果（含 95% 置信区间）
 st.subheader("模拟结果概览")
-st.write(f"达到目标盈利({total_target:.0f})的概率：**{success_rate*100:.1f}%**")
-st.write(f"最终盈利为正的概率：**{profit_positive_rate*100:.1f}%**")
-st.write(f"发生资金亏空(破产)的概率：**{bankrupt_rate*100:.1f}%**")
+st.write(f"达到目标盈利({total_target:.0f})的概率：{rate_text(rates['achieved_target'])}")
+st.write(f"最终盈利为正的概率：{rate_text(rates['profit_positive'])}")
+st.write(f"发生资金亏空(破产)的概率：{rate_text(rates['bankrupt'])}")
+
+# 精确计算：资金只会落在有限个取值上，逐天递推资金的概率分布，没有抽样误差，耗时与模拟次数无关；
+# 天数多、每日投注次数多时资金取值很多，可能要算几秒到几十秒，勾选后才计算
+st.subheader("精确概率（按资金分布逐天递推，无抽样误差）")
+if st.checkbox("精确计算（天数或每日投注次数较多时可能较慢）", value=False):
+    exact = cache.exact_outcome(cap, odds, p, num_days, bets_each_day, strategy_name, total_target, daily_target,
+                                flat_stake, bet_percentage)
+    if exact is None:
+        st.info(f"资金可能的取值超过 {simulation.MAX_STATES} 种，无法精确计算，请参考上面的模拟结果。")
+    else:
+        st.write(f"达到目标盈利({total_target:.0f})的概率：**{exact['achieved_target']*100:.4f}%**")
+        st.write(f"最终盈利为正的概率：**{exact['profit_positive']*100:.4f}%**")
+        st.write(f"发生资金亏空(破产)的概率：**{exact['bankrupt']*100:.4f}%**")
+        st.write(f"平均最终盈亏：**{exact['expected_profit']:.2f}**")
+
+# 重要性抽样：破产概率很小时普通模拟几乎抽不到破产，估计为 0；降低开奖的中奖概率后按似然比加权，估计无偏
+importance = st.checkbox("重要性抽样估计破产概率（破产是稀有事件、上面的模拟结果接近 0 时使用）", value=False)
+if importance:
+    importance_runs = st.number_input("重要性抽样模拟次数", min_value=1000, max_value=200000, value=10000, step=1000)
+    ruin = cache.importance_ruin(importance_runs, cap, odds, p, num_days, bets_each_day, strategy_name, total_target,
+                                 daily_target, flat_stake, bet_percentage, int(sim_seed))
+    st.write(f"破产概率：**{ruin['estimate']:.3e}**（95% 置信区间 ± {ruin['half_width']:.3e}，"
+             f"相对误差 {ruin['relative_error']*100:.2f}%）")
+    st.caption(f"抽样时每注中奖概率由 {p:.4f} 降为 {ruin['sampling_prob']:.4f}，"
+               f"{ruin['runs']} 次抽样中有 {ruin['hits']} 次破产。")
 
 # 盈利分布图表
 st.subheader("最终盈利分布")
 final_profit_series = pd.Series(results["final_profit"], name="最终盈亏")
-hist_chart = alt.Chart(pd.DataFrame({"profit": results["final_profit"]})).mark_bar().encode(
-    alt.X("profit", bin=alt.Bin(maxbins=20), title="最终盈亏区间"),
-    alt.Y('count()', title='频数')
-)
-st.altair_chart(hist_chart, use_container_width=True)
+st.altair_chart(profit_histogram(results["final_profit"]), use_container_width=True)
+
+# 路径统计：模拟时逐注在线累计，不保存每次运行的资金路径
+st.subheader("路径统计（资金准备）")
+st.write("最大回撤为相对此前最高资金的最大跌幅，最大单注为一次投注需要的最大金额（马丁格尔策略据此准备资金）：")
+st.dataframe(simulation.path_quantiles(results).style.format("{:.2f}"))
+day_columns = st.columns(2)
+for column, key, title in zip(day_columns, ["ruin_day", "target_day"], ["破产发生在第几天", "达到目标发生在第几天"]):
+    day_chart = alt.Chart(simulation.day_counts(results[key], num_days)).mark_bar().encode(
+        alt.X("天数:O", title="天数"),
+        alt.Y("次数:Q", title="次数"),
+        tooltip=["天数", "次数"]
+    ).properties(title=title)
+    column.altair_chart(day_chart, use_container_width=True)
 
 st.write("注：以上模拟为基于随机模型的估计，实际结果可能受多种因素影响。调整参数以查看不同情景下策略的表现。")
 
+# 参数扫描：在两个参数的网格上一次性模拟全部组合（共用同一组随机数），输出热力图
+st.subheader("参数扫描")
+sweep = st.checkbox("在两个参数的网格上同时模拟，输出达到目标概率和破产概率热力图", value=False)
+if sweep:
+    sweep_options = ["投注赔率", "胜率", "每日投注次数"]
+    col_x, col_y = st.columns(2)
+    x_param = col_x.selectbox("横轴参数", sweep_options, index=0)
+    y_param = col_y.selectbox("纵轴参数", [option for option in sweep_options if option != x_param], index=0)
+
+    def sweep_values(name, column):
+        """在 column 中输入 name 的扫描范围，返回取值数组（最多 20 个）。"""
+        if name == "每日投注次数":
+            low = column.number_input(f"{name}最小值", min_value=1, value=1, step=1)
+            high = column.number_input(f"{name}最大值", min_value=int(low), value=int(low) + 9, step=1)
+            return np.arange(int(low), min(int(high), int(low) + 19) + 1)
+        if name == "投注赔率":
+            low = column.number_input(f"{name}最小值", min_value=1.01, value=1.5, step=0.1)
+            high = column.number_input(f"{name}最大值", min_value=float(low), value=max(float(low), 3.0), step=0.1)
+        else:
+            low = column.number_input(f"{name}最小值", min_value=0.0, max_value=1.0, value=0.3, step=0.05)
+            high = column.number_input(f"{name}最大值", min_value=float(low), max_value=1.0, value=max(float(low), 0.7),
+                                       step=0.05)
+        steps = column.number_input(f"{name}取值个数", min_value=2, max_value=20, value=10, step=1)
+        return np.round(np.linspace(low, high, int(steps)), 4)
+
+    x_values = sweep_values(x_param, col_x)
+    y_values = sweep_values(y_param, col_y)
+    grid_runs = st.number_input("每个参数组合的模拟次数", min_value=100, max_value=10000, value=1000, step=100)
+
+    # 未扫描的参数取侧边栏的值；假设赔率公平且未扫描胜率时，胜率随赔率变化
+    grid_x, grid_y = np.meshgrid(x_values, y_values)
+    grid = {"投注赔率": np.full(grid_x.size, odds), "胜率": np.full(grid_x.size, p),
+            "每日投注次数": np.full(grid_x.size, bets_each_day)}
+    grid[x_param] = grid_x.ravel()
+    grid[y_param] = grid_y.ravel()
+    if assume_fair and "胜率" not in (x_param, y_param):
+        grid["胜率"] = 1.0 / grid["投注赔率"]
+
+    grid_results = cache.simulate_grid(grid_runs, cap, tuple(grid["投注赔率"]), tuple(grid["胜率"]), num_days,
+                                       tuple(grid["每日投注次数"]), strategy_name, total_target, daily_target,
+                                       flat_stake, bet_percentage, int(sim_seed))
+    grid_data = pd.DataFrame({
+        x_param: grid[x_param],
+        y_param: grid[y_param],
+        "达到目标概率": grid_results["achieved_target"],
+        "破产概率": grid_results["bankrupt"],
+        "平均最终盈亏": grid_results["expected_profit"],
+    })
+    heatmap_columns = st.columns(2)
+    for column, metric, scheme in zip(heatmap_columns, ["达到目标概率", "破产概率"], ["greens", "reds"]):
+        heatmap = alt.Chart(grid_data).mark_rect().encode(
+            alt.X(f"{x_param}:O", title=x_param),
+            alt.Y(f"{y_param}:O", title=y_param, sort="descending"),
+            alt.Color(f"{metric}:Q", title=metric, scale=alt.Scale(scheme=scheme), legend=alt.Legend(format=".0%")),
+            tooltip=[x_param, y_param, alt.Tooltip(f"{metric}:Q", format=".2%"),
+                     alt.Tooltip("平均最终盈亏:Q", format=".2f")]
+        ).properties(title=metric)
+        column.altair_chart(heatmap, use_container_width=True)
+
+# 策略对比：各策略在同一组开奖结果上运行，按运行配对比较，差值的误差远小于分别模拟后相减
+st.subheader("策略对比")
+compare = st.checkbox("在同一组开奖结果上同时模拟多种策略，输出与当前策略的配对差值", value=False)
+if compare:
+    compare_names = st.multiselect("参与对比的策略", simulation.STRATEGIES, default=simulation.STRATEGIES)
+    if strategy_name not in compare_names:
+        compare_names = [strategy_name] + compare_names
+    # 侧边栏只显示当前策略的参数，其余策略的参数在这里补充
+    compare_columns = st.columns(3)
+    compare_daily_target = daily_target
+    if compare_daily_target is None:
+        compare_daily_target = compare_columns[0].number_input("马丁格尔单日目标盈利", min_value=0.0, value=20.0,
+                                                               step=5.0)
+    compare_flat_stake = flat_stake
+    if compare_flat_stake is None:
+        compare_flat_stake = compare_columns[1].number_input("固定投注额", min_value=0.0, value=50.0, step=10.0)
+    compare_bet_percent = bet_percentage
+    if compare_bet_percent is None:
+        compare_bet_percent = compare_columns[2].slider("比例投注资金比例 (%)", min_value=0.0, max_value=100.0,
+                                                       value=10.0, step=1.0) / 100.0
+    compare_runs = st.number_input("对比模拟次数", min_value=100, max_value=500000, value=20000, step=1000)
+    antithetic = st.checkbox("对偶抽样（后一半运行使用前一半的对偶随机数，进一步降低方差）", value=True)
+
+    compare_results = cache.compare_strategies(compare_runs, cap, odds, p, num_days, bets_each_day,
+                                               tuple(compare_names), total_target, compare_daily_target,
+                                               compare_flat_stake, compare_bet_percent, int(sim_seed), antithetic)
+    baseline = compare_results[strategy_name]
+    rows = []
+    for name in compare_names:
+        result = compare_results[name]
+        target_diff, target_error = simulation.paired_difference(result["achieved_target"],
+                                                                 baseline["achieved_target"], antithetic)
+        ruin_diff, ruin_error = simulation.paired_difference(result["bankrupt"], baseline["bankrupt"], antithetic)
+        profit_diff, profit_error = simulation.paired_difference(result["final_profit"], baseline["final_profit"],
+                                                                 antithetic)
+        rows.append({
+            "策略": name,
+            "达到目标概率": result["achieved_target"].mean(),
+            "破产概率": result["bankrupt"].mean(),
+            "平均最终盈亏": result["final_profit"].mean(),
+            "达到目标概率差": f"{target_diff*100:+.2f}% ± {target_error*100:.2f}%",
+            "破产概率差": f"{ruin_diff*100:+.2f}% ± {ruin_error*100:.2f}%",
+            "平均盈亏差": f"{profit_diff:+.2f} ± {profit_error:.2f}",
+        })
+    st.dataframe(pd.DataFrame(rows).style.format({"达到目标概率": "{:.2%}", "破产概率": "{:.2%}",
+                                                  "平均最终盈亏": "{:.2f}"}))
+    st.caption(f"差值均为相对当前策略（{strategy_name}），± 后为 95% 置信区间半宽；"
+               f"区间不含 0 时可认为两种策略确有差异。")
+
+# 历史重抽样：每注的赔率和是否中奖按块从上传的历史记录中抽取，反映真实的赔率组合和连败结构
+st.subheader("按历史记录重抽样模拟")
+if uploaded_file and data is not None and odds_col and (outcome_col or profit_col):
+    bootstrap = st.checkbox("用上传的历史赔率和中奖结果代替固定赔率/胜率进行模拟（块自助法）", value=False)
+    if bootstrap:
+        col_runs, col_block = st.columns(2)
+        bootstrap_runs = col_runs.number_input("重抽样模拟次数", min_value=100, max_value=1000000, value=10000,
+                                               step=1000)
+        block_length = col_block.number_input("每段连续历史记录数（保留连中/连败结构）", min_value=1, max_value=1000,
+                                              value=simulation.BOOTSTRAP_BLOCK_LENGTH, step=1)
+        sample = cache.bootstrap_sample(digest, odds_col, outcome_col, profit_col, data)
+        if len(sample[0]) == 0:
+            st.info("历史记录中没有有效的赔率（大于 1），无法重抽样。")
+        else:
+            bootstrap_results = cache.simulate_bootstrap(digest, bootstrap_runs, cap, num_days, bets_each_day,
+                                                         strategy_name, total_target, daily_target, flat_stake,
+                                                         bet_percentage, block_length, int(sim_seed), _sample=sample)
+            bootstrap_rates = simulation.estimate_rates(bootstrap_results)
+            st.write(f"达到目标盈利({total_target:.0f})的概率：{rate_text(bootstrap_rates['achieved_target'])}")
+            st.write(f"最终盈利为正的概率：{rate_text(bootstrap_rates['profit_positive'])}")
+            st.write(f"发生资金亏空(破产)的概率：{rate_text(bootstrap_rates['bankrupt'])}")
+            st.altair_chart(profit_histogram(bootstrap_results["final_profit"]), use_container_width=True)
+            st.caption(f"从 {len(sample[0])} 条历史记录中重抽样；凯利策略按各赔率区间的历史中奖率计算投注比例。")
+else:
+    st.info("上传含赔率和中奖结果（或盈亏）的历史数据后，可按历史记录重抽样模拟。")
+
 st.write("----")
 
 # 3. 决策支持 - 每日最佳投注组合推荐
@@ -388,49 +494,25 @@ st.markdown("""
 根据当前策略和历史数据(如有)，系统推荐以下投注选项以供今日参考。您可以根据经验和偏好对推荐进行调整。
 """)
 
-# 如果有历史数据，可以基于历史胜率或赔率分布生成推荐；没有则随机生成示例
+# 有历史数据时按各 (赔率区间, 玩法) 的历史命中率计算候选投注的期望值并排序；没有则随机生成示例
 recommendations = []
 np.random.seed(42)  # 固定随机种子使示例可重复
-if uploaded_file and odds_col and outcome_col:
-    # 如果有历史数据，用历史平均胜率和赔率生成示例
-    # 计算历史整体胜率
-    if outcome_col:
-        try:
-            hist_outcomes = data[outcome_col].apply(lambda x: 1 if str(x) in ["1", "win", "Win", "WIN", "中奖"] else 0)
-            hist_win_rate = hist_outcomes.mean()
-        except:
-            hist_win_rate = None
-    else:
-        hist_win_rate = None
-    # 历史平均赔率
-    if odds_col:
-        try:
-            avg_odds_val = float(data[odds_col].mean())
-        except:
-            avg_odds_val = odds
-    else:
-        avg_odds_val = odds
-    # 使用历史平均赔率和胜率波动随机推荐
-    for i in range(3):
-        # 生成接近历史平均赔率的随机赔率
-        rec_odds = max(1.01, np.random.normal(loc=avg_odds_val, scale=0.5))
-        # 生成预测胜率：稍高于隐含胜率，假设存在一定优势
-        implied_p = 1.0 / rec_odds
-        if hist_win_rate:
-            # 结合历史胜率和隐含概率
-            predicted_p = min(0.99, max(implied_p, (hist_win_rate + implied_p)/2 + 0.05))
-        else:
-            predicted_p = min(0.99, implied_p + 0.1)
-        team_a = chr(65 + i*2)  # 用字母模拟球队名
-        team_b = chr(65 + i*2 + 1)
-        match_name = f"球队{team_a} vs 球队{team_b}"
-        ev = predicted_p * rec_odds
+if uploaded_file and data is not None and odds_col and (outcome_col or profit_col):
+    top_k = st.number_input("推荐个数", min_value=1, max_value=50, value=recommend.TOP_K, step=1)
+    rec_index, candidate_bets = cache.recommendation_index(digest, odds_col, outcome_col, profit_col, columns["play"],
+                                                           columns["match"], data)
+    ranked = recommend.top_recommendations(rec_index, candidate_bets, odds_col, columns["play"], top_k)
+    for _, row in ranked.iterrows():
         recommendations.append({
-            "比赛": match_name,
-            "赔率": f"{rec_odds:.2f}",
-            "预计胜率": f"{predicted_p*100:.1f}%",
-            "期望值EV": f"{ev:.2f}"
+            "比赛": str(row[columns["match"]]) if columns["match"] else "-",
+            "玩法": str(row[columns["play"]]) if columns["play"] else "-",
+            "赔率": f"{float(row[odds_col]):.2f}",
+            "历史投注次数": str(row["历史投注次数"]),
+            "预计胜率": f"{row['预计胜率']*100:.1f}%",
+            "期望值EV": f"{row['期望值EV']:.2f}"
         })
+    with st.expander("各赔率区间/玩法的历史命中率"):
+        st.dataframe(rec_index["table"].style.format({"命中率": "{:.2%}"}))
 else:
     # 无历史数据，用预设或随机数据推荐
     sample_matches = [("红队", "蓝队"), ("黄队", "绿队"), ("黑队", "白队")]
@@ -449,12 +531,7 @@ else:
 
 rec_df = pd.DataFrame(recommendations)
 # 确保数据类型转换
-rec_df = rec_df.astype({
-    "比赛": str,
-    "赔率": str,
-    "预计胜率": str,
-    "期望值EV": str
-})
+rec_df = rec_df.astype(str)
 st.subheader("推荐投注选项:")
 st.table(rec_df)
 
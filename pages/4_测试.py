@@ -1,8 +1,9 @@
 import streamlit as st
 import matplotlib.pyplot as plt
-from itertools import combinations
 import matplotlib.font_manager as fm
-import pandas as pd
+
+from lottery import cache, charts
+from lottery.total_goals import MAX_STRUCTURES
 
 # 尝试加载黑体字体
 font_path = 'C:/Windows/Fonts/simhei.ttf'  # 更新为黑体字体路径
@@ -45,67 +46,21 @@ max_bet = initial_bet * fibonacci_sequence[no_win_days]
 # 显示最大投注金额
 st.subheader(f'在连续 {no_win_days} 次未中奖的情况下，下一次投注金额为：{max_bet} 元')
 
-# 生成所有未中奖天数的组合
-all_combinations = list(combinations(range(days), no_win_days))
-
-# 存储所有结果
-results = []
-
-for combo in all_combinations:
-    current_bet = initial_bet
-    previous_bet = 0  # 用于计算斐波那契
-    total_profit = 0
-    daily_profit = []
-
-    for day in range(days):
-        if day in combo:  # 未中奖
-            profit = -current_bet
-            # 计算下一次投注额
-            if previous_bet == 0:  # 第一次未中奖
-                next_bet = current_bet * 2  # 第二天200
-            else:
-                next_bet = current_bet + previous_bet
-            previous_bet, current_bet = current_bet, next_bet
-        else:  # 中奖
-            profit = current_bet * odds - current_bet  # 计算盈利
-            current_bet = initial_bet  # 重置投注
-            previous_bet = 0
-
-        total_profit += profit
-        daily_profit.append(profit)
-
-    results.append({
-        "未中奖天数": combo,
-        "每日盈亏": daily_profit,
-        "总盈亏": total_profit
-    })
-
-# 创建DataFrame并按"总盈亏"升序排序
-df = pd.DataFrame(results)
-df_sorted = df.sort_values(by="总盈亏", ascending=True)
-
-# 统计"总盈亏"列中每个值的出现次数
-profit_counts = df_sorted['总盈亏'].value_counts().reset_index()
-profit_counts.columns = ['总盈亏', '出现次数']
-
-# 计算每个结果占总数的百分比
-total_combinations = len(df_sorted)
-profit_counts['百分比'] = profit_counts['出现次数'] / total_combinations * 100
+# 按连败结构动态规划，直接得到每种总盈亏的出现次数和百分比（与逐条枚举所有未中奖天数组合的结果一致），
+# 结果按参数缓存，重复的参数直接复用
+profit_counts = cache.profit_distribution(odds, days, no_win_days, initial_bet)
+if profit_counts is None:
+    st.warning(f'不同连败结构超过 {MAX_STRUCTURES} 种，无法精确计算，请减少天数或未中奖天数。')
+    st.stop()
 
 # 显示数据表格
 st.subheader('盈亏结果数据')
 st.dataframe(profit_counts)
 
-# 绘制柱状图
-fig, ax = plt.subplots()
-ax.bar(profit_counts['总盈亏'].astype(str), profit_counts['出现次数'], color='skyblue')
-ax.set_xlabel('总盈亏')
-ax.set_ylabel('出现次数')
-ax.set_title('每个盈亏结果的出现次数')
-st.pyplot(fig)
+# 绘制柱状图（不同结果过多时按总盈亏分箱），渲染结果按图表数据缓存
+labels, heights = charts.bar_data(profit_counts, '总盈亏')
+st.image(cache.bar_png(labels, heights, '每个盈亏结果的出现次数', '总盈亏', '出现次数'))
 
-# 绘制饼图
-fig, ax = plt.subplots()
-ax.pie(profit_counts['百分比'], labels=profit_counts['总盈亏'].astype(str), autopct='%1.1f%%', startangle=90)
-ax.set_title('每个盈亏结果占总数的百分比')
-st.pyplot(fig)
+# 绘制饼图（占比最小的结果合并为"其他"）
+labels, shares = charts.pie_data(profit_counts, '总盈亏')
+st.image(cache.pie_png(labels, shares, '每个盈亏结果占总数的百分比'))
@@ -1,176 +1,247 @@
-import streamlit as st
-import pandas as pd
-from itertools import combinations
-
-# 设置页面配置
-st.set_page_config(
-    page_title="彩票计算器",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
-
-# 页面标题
-st.title('总进球玩法预测（可选择斐波那契或倍投策略）')
-
-# 创建两列用于输入参数
-col1, col2 = st.columns(2)
-
-with col1:
-    # 添加赔率输入框
-    odds = st.number_input('请输入赔率', min_value=1.0, max_value=10.0, value=1.35, step=0.01)
-    # 添加下注次数输入框
-    days = st.number_input('请输入下注次数（天数）', min_value=1, max_value=100, value=10, step=1)
-    # 添加未中奖天数输入框
-    no_win_days = st.number_input('请输入未中奖天数', min_value=1, max_value=days, value=3, step=1)
-
-with col2:
-    # 添加初始投注金额输入框
-    initial_bet = st.number_input('请输入初始投注金额', min_value=1, max_value=1000, value=100, step=1)
-    # 添加店主提成比例输入框
-    commission_rate = st.number_input('请输入店主提成比例（%）', min_value=0.0, max_value=8.0, value=5.0, step=0.1) / 100
-    # 添加店主实际赔率输入框
-    actual_odds = st.number_input('请输入店主实际赔率', min_value=1.0, max_value=10.0, value=1.45, step=0.01)
-
-# 添加策略选择和倍投倍数输入
-st.sidebar.subheader("选择下注策略")
-strategy = st.sidebar.radio("策略", ("斐波那契", "倍投"))
-
-if strategy == "倍投":
-    multiplier = st.sidebar.number_input('请输入倍投倍数', min_value=1, max_value=99, value=2, step=1)
-else:
-    multiplier = None  # 斐波那契策略不需要倍数
-
-# 计算斐波那契数列
-def fibonacci(n):
-    sequence = [1, 1]
-    for i in range(2, n):
-        sequence.append(sequence[-1] + sequence[-2])
-    return sequence
-
-# 计算最大投注金额
-if strategy == "斐波那契":
-    fibonacci_sequence = fibonacci(no_win_days + 1)
-    max_bet = initial_bet * fibonacci_sequence[no_win_days]
-else:
-    max_bet = initial_bet * (multiplier ** no_win_days)
-
-# 显示最大投注金额
-st.subheader(f'在连续 {no_win_days} 次未中奖的情况下，下一次投注金额为：{max_bet} 元')
-
-# 生成所有未中奖天数的组合
-all_combinations = list(combinations(range(days), no_win_days))
-
-# 存储所有结果
-results = []
-
-for combo in all_combinations:
-    current_bet = initial_bet
-    previous_bet = 0  # 用于计算斐波那契
-    total_profit = 0
-    daily_profit = []
-    total_bet = 0  # 记录每种结果的投注总金额
-
-    for day in range(days):
-        if day in combo:  # 未中奖
-            profit = -current_bet
-            # 计算下一次投注额
-            if strategy == "斐波那契":
-                if previous_bet == 0:  # 第一次未中奖
-                    next_bet = current_bet * 2  # 第二天200
-                else:
-                    next_bet = current_bet + previous_bet
-                previous_bet, current_bet = current_bet, next_bet
-            else:  # 倍投策略
-                current_bet *= multiplier
-        else:  # 中奖
-            profit = current_bet * odds - current_bet  # 计算盈利
-            current_bet = initial_bet  # 重置投注
-            previous_bet = 0
-
-        total_profit += profit
-        daily_profit.append(profit)
-        total_bet += current_bet  # 累加每次投注金额
-
-    # 计算店主收入（包括提成和赔率差）
-    commission_income = total_bet * commission_rate
-    odds_difference_income = sum([bet * (actual_odds - odds) for bet in daily_profit if bet > 0])
-    owner_commission = commission_income + odds_difference_income
-
-    results.append({
-        "未中奖天数": combo,
-        "每日盈亏": daily_profit,
-        "总盈亏": total_profit,
-        "投注总金额": total_bet,
-        "店主提成收入": commission_income,
-        "店主赔率差收入": odds_difference_income,
-        "店主总收入": owner_commission
-    })
-
-# 创建DataFrame并按"总盈亏"升序排序
-df = pd.DataFrame(results)
-df_sorted = df.sort_values(by="总盈亏", ascending=True)
-
-# 计算总奖金
-df_sorted['总奖金'] = df_sorted['总盈亏'] + df_sorted['投注总金额']
-
-# 统计"总盈亏"列中每个值的出现次数
-profit_counts = df_sorted['总盈亏'].value_counts().reset_index()
-profit_counts.columns = ['总盈亏', '出现次数']
-
-# 计算每个结果占总数的百分比
-total_combinations = len(df_sorted)
-profit_counts['概率'] = profit_counts['出现次数'] / total_combinations * 100
-
-# 计算盈亏百分比
-winning_percentage = profit_counts[profit_counts['总盈亏'] > 0]['概率'].sum()
-losing_percentage = profit_counts[profit_counts['总盈亏'] <= 0]['概率'].sum()
-
-# 创建盈亏百分比表格
-percentage_data = pd.DataFrame({
-    '类型': ['盈利', '亏损'],
-    '百分比': [winning_percentage, losing_percentage]
-})
-
-# 统计彩民总投注金额和总奖金的情况
-bet_counts = df_sorted['投注总金额'].value_counts().reset_index()
-bet_counts.columns = ['投注总金额', '出现次数']
-bet_counts['概率'] = bet_counts['出现次数'] / total_combinations * 100
-
-prize_counts = df_sorted['总奖金'].value_counts().reset_index()
-prize_counts.columns = ['总奖金', '出现次数']
-prize_counts['概率'] = prize_counts['出现次数'] / total_combinations * 100
-
-# 创建两个主要部分：彩民数据和店主数据
-st.title("彩票计算器结果展示")
-
-st.header("彩民盈亏结果数据")
-col1, col2 = st.columns(2)
-
-with col1:
-    st.subheader('彩民总投注金额情况')
-    st.dataframe(bet_counts.style.format({'投注总金额': '{:.2f}', '出现次数': '{:.0f}', '概率': '{:.2f}%'}), use_container_width=True)
-
-with col2:
-    st.subheader('彩民总奖金情况')
-    st.dataframe(prize_counts.style.format({'总奖金': '{:.2f}', '出现次数': '{:.0f}', '概率': '{:.2f}%'}), use_container_width=True)
-
-# 新增彩民盈亏结果数据表格
-st.header("彩民盈亏结果详细数据")
-st.dataframe(profit_counts.style.format({'总盈亏': '{:.2f}', '出现次数': '{:.0f}', '概率': '{:.2f}%'}), use_container_width=True)
-
-st.header("店主数据")
-col3, col4 = st.columns(2)
-
-with col3:
-    st.subheader('店主盈亏结果数据')
-    st.dataframe(profit_counts.style.format({'总盈亏': '{:.2f}', '出现次数': '{:.0f}', '概率': '{:.2f}%'}), use_container_width=True)
-
-with col4:
-    st.subheader('彩民盈亏百分比')
-    st.table(percentage_data.style.format({'百分比': '{:.2f}%'}))
-
-    # 显示总体统计信息
-    total_profit = df_sorted['总盈亏'].sum()
-    avg_profit = df_sorted['总盈亏'].mean()
-    st.write(f'总计盈亏：{total_profit:.2f} 元')
-    st.write(f'平均盈亏：{avg_profit:.2f} 元') 
\ No newline at end of file
+import streamlit as st
+import pandas as pd
+import os
+from math import comb
+
+from lottery import cache
+from lottery.total_goals import MAX_STRUCTURES, surface_summary, weight_surface
+from lottery.paths import TABLE_MAX_PATHS, STREAM_MAX_PATHS
+from lottery.drilldown import path_at_rank
+
+# 设置页面配置
+st.set_page_config(
+    page_title="彩票计算器",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+# 页面标题
+st.title('总进球玩法预测（可选择斐波那契或倍投策略）')
+
+# 创建两列用于输入参数
+col1, col2 = st.columns(2)
+
+with col1:
+    # 添加赔率输入框
+    odds = st.number_input('请输入赔率', min_value=1.0, max_value=10.0, value=1.35, step=0.01)
+    # 添加下注次数输入框
+    days = st.number_input('请输入下注次数（天数）', min_value=1, max_value=100, value=10, step=1)
+    # 添加未中奖天数输入框
+    no_win_days = st.number_input('请输入未中奖天数', min_value=1, max_value=days, value=3, step=1)
+
+with col2:
+    # 添加初始投注金额输入框
+    initial_bet = st.number_input('请输入初始投注金额', min_value=1, max_value=1000, value=100, step=1)
+    # 添加店主提成比例输入框
+    commission_rate = st.number_input('请输入店主提成比例（%）', min_value=0.0, max_value=8.0, value=5.0, step=0.1) / 100
+    # 添加店主实际赔率输入框
+    actual_odds = st.number_input('请输入店主实际赔率', min_value=1.0, max_value=10.0, value=1.45, step=0.01)
+
+# 添加策略选择和倍投倍数输入
+st.sidebar.subheader("选择下注策略")
+strategy = st.sidebar.radio("策略", ("斐波那契", "倍投"))
+
+if strategy == "倍投":
+    multiplier = st.sidebar.number_input('请输入倍投倍数', min_value=1, max_value=99, value=2, step=1)
+else:
+    multiplier = None  # 斐波那契策略不需要倍数
+
+# 计算斐波那契数列
+def fibonacci(n):
+    sequence = [1, 1]
+    for i in range(2, n):
+        sequence.append(sequence[-1] + sequence[-2])
+    return sequence
+
+# 计算最大投注金额
+if strategy == "斐波那契":
+    fibonacci_sequence = fibonacci(no_win_days + 1)
+    max_bet = initial_bet * fibonacci_sequence[no_win_days]
+else:
+    max_bet = initial_bet * (multiplier ** no_win_days)
+
+# 显示最大投注金额
+st.subheader(f'在连续 {no_win_days} 次未中奖的情况下，下一次投注金额为：{max_bet} 元')
+
+# 按连败结构动态规划统计彩民总盈亏、投注总金额和总奖金的分布，代替逐条枚举所有未中奖天数组合；
+# 结果按参数缓存，重复的参数直接复用
+total_combinations = comb(days, no_win_days)
+player_results = cache.player_tables(odds, days, no_win_days, initial_bet, strategy, multiplier)
+if player_results is None:
+    st.warning(f'不同连败结构超过 {MAX_STRUCTURES} 种，无法精确计算。天数不超过 64 时全部未中奖天数都可计算；'
+               f'天数更多时，未中奖天数约在 50 到 天数 - 6（当前为 {days - 6}）之间的组合超过上限，'
+               '请减少天数，或把未中奖天数调到 50 以下或接近天数。')
+    st.stop()
+profit_counts = player_results['总盈亏']
+
+# 计算盈亏百分比
+winning_percentage = profit_counts[profit_counts['总盈亏'] > 0]['概率'].sum()
+losing_percentage = profit_counts[profit_counts['总盈亏'] <= 0]['概率'].sum()
+
+# 创建盈亏百分比表格
+percentage_data = pd.DataFrame({
+    '类型': ['盈利', '亏损'],
+    '百分比': [winning_percentage, losing_percentage]
+})
+
+# 统计彩民总投注金额和总奖金的情况
+bet_counts = player_results['投注总金额']
+prize_counts = player_results['总奖金']
+
+# 创建两个主要部分：彩民数据和店主数据
+st.title("彩票计算器结果展示")
+
+# 结果表已按概率降序排列；行数过多时只展示概率最高的部分（Styler 渲染的单元格数有上限）
+DISPLAY_MAX_ROWS = 10000
+
+
+def show_table(table, formats):
+    if len(table) > DISPLAY_MAX_ROWS:
+        st.caption(f'共 {len(table)} 种结果，仅显示概率最高的前 {DISPLAY_MAX_ROWS} 种')
+        table = table.head(DISPLAY_MAX_ROWS)
+    st.dataframe(table.style.format(formats), use_container_width=True)
+
+
+st.header("彩民盈亏结果数据")
+col1, col2 = st.columns(2)
+
+with col1:
+    st.subheader('彩民总投注金额情况')
+    show_table(bet_counts, {'投注总金额': '{:.2f}', '出现次数': '{:.0f}', '概率': '{:.2f}%'})
+
+with col2:
+    st.subheader('彩民总奖金情况')
+    show_table(prize_counts, {'总奖金': '{:.2f}', '出现次数': '{:.0f}', '概率': '{:.2f}%'})
+
+# 新增彩民盈亏结果数据表格
+st.header("彩民盈亏结果详细数据")
+show_table(profit_counts, {'总盈亏': '{:.2f}', '出现次数': '{:.0f}', '概率': '{:.2f}%'})
+
+# 店主收入：按连败结构精确计算彩民总盈亏、店主总收入、投注总金额的联合分布
+owner_results = cache.joint_tables(odds, days, no_win_days, initial_bet, commission_rate, actual_odds, strategy,
+                                   multiplier)
+owner_counts = owner_results['店主总收入']
+
+st.header("店主数据")
+col3, col4 = st.columns(2)
+
+with col3:
+    st.subheader('店主总收入分布')
+    show_table(owner_counts, {'店主总收入': '{:.2f}', '出现次数': '{:.0f}', '概率': '{:.2f}%'})
+
+    # 显示店主收入统计信息
+    commission_total = owner_results['店主提成收入合计']
+    odds_difference_total = owner_results['店主赔率差收入合计']
+    st.write(f'平均店主提成收入：{commission_total / total_combinations:.2f} 元')
+    st.write(f'平均店主赔率差收入：{odds_difference_total / total_combinations:.2f} 元')
+    st.write(f'平均店主总收入：{(commission_total + odds_difference_total) / total_combinations:.2f} 元')
+
+with col4:
+    st.subheader('彩民盈亏百分比')
+    st.table(percentage_data.style.format({'百分比': '{:.2f}%'}))
+
+    # 显示总体统计信息
+    total_profit = player_results['总盈亏合计']
+    avg_profit = total_profit / total_combinations
+    st.write(f'总计盈亏：{total_profit:.2f} 元')
+    st.write(f'平均盈亏：{avg_profit:.2f} 元') 
+
+st.subheader('彩民总盈亏、店主总收入与投注总金额联合分布')
+joint_format = {'彩民总盈亏': '{:.2f}', '店主总收入': '{:.2f}', '投注总金额': '{:.2f}', '出现次数': '{:.0f}', '概率': '{:.2f}%'}
+show_table(owner_results['联合分布'], joint_format)
+
+# ========= 逐条路径明细 =========
+st.header("逐条路径明细")
+show_paths = st.checkbox('显示每种未中奖天数组合的盈亏与店主收入明细', value=False)
+
+if show_paths:
+    # 路径较多时按组合序号分片到多个进程回放
+    cpu_count = os.cpu_count() or 1
+    workers = st.number_input('并行进程数', min_value=1, max_value=cpu_count, value=cpu_count, step=1)
+    if total_combinations <= TABLE_MAX_PATHS:
+        # 按块向量化回放每条路径
+        paths = cache.path_table(odds, days, no_win_days, initial_bet, strategy, multiplier, commission_rate,
+                                 actual_odds, _workers=workers)
+        paths = paths.sort_values(by="总盈亏", ascending=True)
+        st.dataframe(paths, use_container_width=True)
+    elif total_combinations <= STREAM_MAX_PATHS:
+        # 路径太多时流式汇总，只保留最差/最好的若干条路径和店主总收入分布
+        top_n = st.number_input('展示最差/最好的路径条数', min_value=1, max_value=100, value=10, step=1)
+        summary = cache.summarize_paths(odds, days, no_win_days, initial_bet, strategy, multiplier, commission_rate,
+                                        actual_odds, top_n=top_n, columns=('总盈亏', '店主总收入'), _workers=workers)
+        st.info(f'共有 {total_combinations} 条路径，只展示总盈亏最差和最好的 {top_n} 条。')
+        col5, col6 = st.columns(2)
+        with col5:
+            st.subheader('总盈亏最差的路径')
+            st.dataframe(summary.worst_paths(), use_container_width=True)
+        with col6:
+            st.subheader('总盈亏最好的路径')
+            st.dataframe(summary.best_paths(), use_container_width=True)
+        st.subheader('店主总收入分布')
+        owner_counts = summary.table('店主总收入', '概率')
+        show_table(owner_counts, {'店主总收入': '{:.2f}', '出现次数': '{:.0f}', '概率': '{:.2f}%'})
+    else:
+        st.warning(f'共有 {total_combinations} 条路径，超过 {STREAM_MAX_PATHS} 条时不逐条回放，请减少天数或未中奖天数。')
+
+# ========= 路径定位 =========
+st.header("路径定位")
+st.markdown("不展开全部路径，直接取出总盈亏最差/最好、指定总盈亏或指定组合序号（字典序，从 0 开始）的具体路径。")
+locate_mode = st.radio("定位方式", ("总盈亏最差", "总盈亏最好", "指定总盈亏", "指定组合序号"), horizontal=True)
+
+if locate_mode in ("总盈亏最差", "总盈亏最好"):
+    locate_count = st.number_input('路径条数', min_value=1, max_value=100, value=10, step=1)
+    located = cache.extreme_paths(odds, days, no_win_days, locate_count, initial_bet, strategy, multiplier,
+                                  largest=(locate_mode == "总盈亏最好"))
+elif locate_mode == "指定总盈亏":
+    target_profit = st.number_input('总盈亏', value=float(profit_counts['总盈亏'].min()), step=1.0, format='%.2f')
+    locate_count = st.number_input('最多显示条数', min_value=1, max_value=100, value=10, step=1)
+    located = cache.outcome_paths(odds, days, no_win_days, target_profit, initial_bet, strategy, multiplier,
+                                  locate_count)
+else:
+    rank_text = st.text_input(f'组合序号（0 到 {total_combinations - 1}）', value='0')
+    try:
+        rank = int(rank_text)
+    except ValueError:
+        rank = -1
+    if 0 <= rank < total_combinations:
+        located = path_at_rank(odds, days, no_win_days, rank, initial_bet, strategy, multiplier)
+    else:
+        st.error('请输入有效的组合序号')
+        located = None
+
+if located is not None:
+    if located.empty:
+        st.write('没有总盈亏等于该值的路径。')
+    else:
+        # 组合序号可能超出 64 位整数范围，转为文本显示
+        st.dataframe(located.astype({'组合序号': str}), use_container_width=True)
+
+# ========= 全部未中奖天数的盈亏分布 =========
+st.header("全部未中奖天数的盈亏分布")
+show_surface = st.checkbox('一次计算未中奖天数从 0 到下注天数的全部盈亏分布', value=False)
+
+if show_surface:
+    # 可选：按每日中奖概率对各未中奖天数做二项分布加权（加权在缓存的曲面上计算，改概率不重新计算曲面）
+    weight_by_prob = st.checkbox('按每日中奖概率加权', value=True)
+    if weight_by_prob:
+        win_prob = st.number_input('请输入每日中奖概率', min_value=0.0, max_value=1.0,
+                                   value=round(1 / odds, 2), step=0.01)
+    else:
+        win_prob = None
+
+    surface = cache.profit_surface(odds, days, initial_bet, strategy, multiplier)
+    if surface is None:
+        st.warning(f'全部未中奖天数的连败结构合计超过 {MAX_STRUCTURES} 种，无法一次计算全部情况'
+                   '（约为斐波那契 52 天、倍投 2 倍 51 天以内），请减少天数。')
+    else:
+        if win_prob is not None:
+            surface = weight_surface(surface, days, win_prob)
+        summary = surface_summary(surface)
+        summary_format = {'路径数': '{:.0f}', '盈利概率': '{:.2f}%', '平均盈亏': '{:.2f}', '最差盈亏': '{:.2f}',
+                          '最好盈亏': '{:.2f}', '出现概率': '{:.2f}%'}
+        st.dataframe(summary.style.format(summary_format), use_container_width=True)
+
+        if win_prob is not None:
+            overall_win = surface.loc[surface['总盈亏'] > 0, '加权概率'].sum()
+            expected_profit = (surface['总盈亏'] * surface['加权概率'] / 100).sum()
+            st.write(f'按每日中奖概率 {win_prob:.2f} 加权：盈利概率 {overall_win:.2f}%，期望盈亏 {expected_profit:.2f} 元')